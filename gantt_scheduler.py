@@ -7,56 +7,75 @@ import argparse
 csv_file = 'tasks.csv'
 exit_flag = False
 config = {}
+args = None
+
+TASK_COLUMNS = ['mode', 'pipe begin', 'input begin', 'input end', 'output begin', 'output end']
+
+# Parse times, handle empty and 'a'
+def parse_time(base, time_str):
+    if not time_str:
+        return None
+    time_str = time_str.strip().rstrip(',')
+    if time_str.startswith('a'):
+        return base + int(time_str[1:])
+    else:
+        return int(time_str)
+
+def iter_tasks(path, config=None):
+    # Single pass over the file: yields one task per row, 'a' offsets resolved in place
+    if config is None:
+        config = {}
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        # Read config from first 3 lines
+        for _ in range(3):
+            line = file.readline()
+            if not line:
+                raise IndexError('missing config lines')
+            parts = line.strip().split(',')
+            if len(parts) >= 2:
+                config[parts[0].strip()] = parts[1].strip()
+        # Read tasks from remaining lines
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        try:
+            columns = [header.index(name) for name in TASK_COLUMNS]
+        except ValueError:
+            raise KeyError(f"missing task columns in header: {header}")
+        mode_col, pb_col, ib_col, ie_col, ob_col, oe_col = columns
+        width = max(columns) + 1
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row = row + [''] * (width - len(row))
+
+            pipe_begin = parse_time(0, row[pb_col].strip())
+            input_begin = parse_time(0, row[ib_col].strip())
+            pipe_end = input_begin  # pipe end = input begin
+            input_end = parse_time(input_begin if input_begin is not None else 0, row[ie_col].strip())
+            if input_end is not None:
+                base = input_end
+            else:
+                base = input_begin if input_begin is not None else 0
+            output_begin = parse_time(base, row[ob_col].strip())
+            output_end = parse_time(output_begin if output_begin is not None else 0, row[oe_col].strip())
+
+            yield {
+                'mode': row[mode_col].replace(' ', ''),
+                'pipe_begin': pipe_begin,
+                'pipe_end': pipe_end,
+                'input_begin': input_begin,
+                'input_end': input_end,
+                'output_begin': output_begin,
+                'output_end': output_end
+            }
 
 def read_tasks():
-    tasks = []
     config = {}
     try:
-        with open(csv_file, 'r', newline='', encoding='utf-8') as file:
-            lines = file.readlines()
-            # Read config from first 3 lines
-            for i in range(3):
-                parts = lines[i].strip().split(',')
-                if len(parts) >= 2:
-                    key = parts[0].strip()
-                    value = parts[1].strip()
-                    config[key] = value
-            # Read tasks from remaining lines
-            reader = csv.DictReader(lines[3:])
-            for row in reader:
-                mode = row['mode'].replace(' ', '')
-                pipe_begin_str = row['pipe begin'].strip()
-                input_begin_str = row['input begin'].strip()
-                input_end_str = row['input end'].strip()
-                output_begin_str = row['output begin'].strip()
-                output_end_str = row['output end'].strip()
-
-                # Parse times, handle empty and 'a'
-                def parse_time(base, time_str):
-                    if not time_str:
-                        return None
-                    time_str = time_str.strip().rstrip(',')
-                    if time_str.startswith('a'):
-                        return base + int(time_str[1:])
-                    else:
-                        return int(time_str)
-
-                pipe_begin = parse_time(0, pipe_begin_str) if pipe_begin_str else None
-                input_begin = parse_time(0, input_begin_str) if input_begin_str else None
-                pipe_end = input_begin  # pipe end = input begin
-                input_end = parse_time(input_begin, input_end_str) if input_begin is not None else (parse_time(0, input_end_str) if input_end_str else None)
-                output_begin = parse_time(input_end if input_end is not None else input_begin, output_begin_str) if input_begin is not None or input_end is not None or input_end_str else (parse_time(0, output_begin_str) if output_begin_str else None)
-                output_end = parse_time(output_begin, output_end_str) if output_begin is not None else (parse_time(0, output_end_str) if output_end_str else None)
-
-                tasks.append({
-                    'mode': mode,
-                    'pipe_begin': pipe_begin,
-                    'pipe_end': pipe_end,
-                    'input_begin': input_begin,
-                    'input_end': input_end,
-                    'output_begin': output_begin,
-                    'output_end': output_end
-                })
+        tasks = list(iter_tasks(csv_file, config))
     except FileNotFoundError:
         print(f"Error: CSV file '{csv_file}' not found.")
         return [], {}
@@ -65,11 +84,17 @@ def read_tasks():
         return [], {}
     return tasks, config
 
-def plot_gantt(tasks, config=None, args=None):
+def plot_gantt(tasks, config=None, args=None, highlight=None):
     if not tasks:
         print("No tasks to plot.")
         return
 
+    # Indices of tasks on the critical path, outlined in red
+    if highlight is None and getattr(args, 'critical_path', False):
+        from pmf_critical_path import critical_task_indices
+        highlight = critical_task_indices(tasks)
+    highlight = highlight or set()
+
     # Check for overlaps between different modes' input or output segments
     def check_overlap(start1, end1, start2, end2):
         return max(start1, start2) < min(end1, end2)
@@ -248,7 +273,11 @@ def plot_gantt(tasks, config=None, args=None):
         left_times = [t for t in [task['pipe_begin'], task['input_begin'], task['input_end'], task['output_begin'], task['output_end']] if t is not None]
         if left_times:
             left_most = min(left_times)
-            plt.text(left_most - 1, bar_y, task['mode'], ha='right', va='center', fontsize=7)
+            if len(tasks) - 1 - i in highlight:
+                plt.barh(bar_y, max(left_times) - left_most, left=left_most, height=0.8, fill=False, edgecolor='red', linewidth=1.5)
+                plt.text(left_most - 1, bar_y, task['mode'], ha='right', va='center', fontsize=7, color='red', weight='bold')
+            else:
+                plt.text(left_most - 1, bar_y, task['mode'], ha='right', va='center', fontsize=7)
 
     # Remove y ticks
     plt.yticks([])
@@ -282,7 +311,11 @@ def plot_gantt(tasks, config=None, args=None):
     gray_patch = plt.Rectangle((0,0),1,1,fc='gray')
     green_patch = plt.Rectangle((0,0),1,1,fc='green')
     orange_patch = plt.Rectangle((0,0),1,1,fc='orange')
-    plt.legend([green_patch, gray_patch, orange_patch], ['Input', 'Transition', 'Output'], loc='upper right', bbox_to_anchor=(1.05, 1.05))
+    if highlight:
+        critical_patch = plt.Rectangle((0,0),1,1,fill=False,ec='red',lw=1.5)
+        plt.legend([green_patch, gray_patch, orange_patch, critical_patch], ['Input', 'Transition', 'Output', 'Critical path'], loc='upper right', bbox_to_anchor=(1.05, 1.05))
+    else:
+        plt.legend([green_patch, gray_patch, orange_patch], ['Input', 'Transition', 'Output'], loc='upper right', bbox_to_anchor=(1.05, 1.05))
 
     # Scaling removed, no legend needed
 
@@ -313,17 +346,19 @@ def refresh_chart():
         plot_gantt(tasks, config, args)
         print("Chart refreshed.")
 
-parser = argparse.ArgumentParser()
-parser.add_argument('--csv-file', default='tasks.csv', help='Input CSV file')
-parser.add_argument('--output', help='Output PNG file name')
-parser.add_argument('--save-only', action='store_true', help='Save PNG without displaying')
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv-file', default='tasks.csv', help='Input CSV file')
+    parser.add_argument('--output', help='Output PNG file name')
+    parser.add_argument('--save-only', action='store_true', help='Save PNG without displaying')
+    parser.add_argument('--critical-path', action='store_true', help='Highlight the critical path')
 
-args = parser.parse_args()
-csv_file = args.csv_file
+    args = parser.parse_args()
+    csv_file = args.csv_file
 
-# Read and plot initial data
-tasks, config = read_tasks()
-if tasks:
-    plot_gantt(tasks, config, args)
-else:
-    print("No tasks found in CSV.")
+    # Read and plot initial data
+    tasks, config = read_tasks()
+    if tasks:
+        plot_gantt(tasks, config, args)
+    else:
+        print("No tasks found in CSV.")
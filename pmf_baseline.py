@@ -0,0 +1,280 @@
+"""
+PMF调度吞吐量回归检查。
+
+保存模式(--save)读取批处理生成的CSV目录，按sheet以及按clean_pmf_tasks
+之后的(size, uv, round)分组记录makespan、最后output_end、重叠周期总数
+和每个mode的各段时长，写入基线JSON文件。
+
+比较模式(--compare)用同样方式统计新一轮结果，与基线逐项对比，打印每个
+任务的周期差值；若任何sheet或分组变慢(makespan或最后output_end增大)，
+以非零状态退出。
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+from process_excel_and_generate_gantts import (
+    read_tasks_from_csv,
+    collect_pmf_tasks,
+    collect_sp_tasks,
+    clean_pmf_tasks,
+    get_size,
+    find_overlaps,
+    merge_intervals,
+)
+
+DEFAULT_BASELINE = 'pmf_baseline.json'
+
+def list_sheet_csvs(csv_dir):
+    """
+    列出目录中由批处理生成的sheet CSV。
+
+    参数:
+        csv_dir (str): CSV目录，如 'PMF_Output'。
+
+    返回:
+        list: (sheet名称, CSV路径)，按名称排序。
+    """
+    sheets = []
+    for name in sorted(os.listdir(csv_dir)):
+        if not name.endswith('.csv'):
+            continue
+        sheet = name[:-len('.csv')]
+        if sheet.startswith('PMF') or sheet.startswith('264PMF'):
+            sheets.append((sheet, os.path.join(csv_dir, name)))
+    return sheets
+
+def overlap_cycles(intervals):
+    """
+    计算区间集合中至少两个区间同时占用的周期数。
+
+    参数:
+        intervals (list): (start, end) 列表。
+
+    返回:
+        int: 重叠周期总数(重叠部分合并后计算，不重复计数)。
+    """
+    return sum(e - s for s, e in merge_intervals(find_overlaps(intervals)))
+
+def task_key(mode, seen):
+    # Sheets repeat helper rows such as INTER_PK8; number repeats to keep keys unique
+    seen[mode] += 1
+    return mode if seen[mode] == 1 else f"{mode}#{seen[mode]}"
+
+def sheet_metrics(tasks):
+    """
+    统计单个sheet的调度指标。
+
+    参数:
+        tasks (list): read_tasks_from_csv 返回的任务。
+
+    返回:
+        dict: makespan, last_output_end, overlap_cycles, modes。
+    """
+    starts = []
+    ends = []
+    modes = {}
+    seen = defaultdict(int)
+    input_intervals = []
+    output_intervals = defaultdict(list)
+    for task in tasks:
+        if not task['mode']:
+            continue
+        times = [t for t in [task['pipe_begin'], task['input_begin'], task['input_end'], task['output_begin'], task['output_end']] if t is not None]
+        if not times:
+            continue
+        starts.append(min(times))
+        if task['output_end'] is not None:
+            ends.append(task['output_end'])
+        durations = {}
+        if task['input_begin'] is not None and task['input_end'] is not None:
+            durations['input'] = task['input_end'] - task['input_begin']
+        if task['input_end'] is not None and task['output_begin'] is not None:
+            durations['transition'] = task['output_begin'] - task['input_end']
+        if task['output_begin'] is not None and task['output_end'] is not None:
+            durations['output'] = task['output_end'] - task['output_begin']
+        durations['output_end'] = task['output_end']
+        modes[task_key(task['mode'], seen)] = durations
+
+        # Same port model as the gantt warnings: shared PMF input, per-size PMF output
+        if task['mode'].startswith('PMF_'):
+            if 'input' in durations:
+                input_intervals.append((task['input_begin'], task['input_end']))
+            if 'output' in durations:
+                output_intervals[get_size(task['mode'])].append((task['output_begin'], task['output_end']))
+
+    overlaps = overlap_cycles(input_intervals)
+    overlaps += sum(overlap_cycles(v) for v in output_intervals.values())
+    return {
+        'makespan': (max(ends) - min(starts)) if ends and starts else 0,
+        'last_output_end': max(ends) if ends else None,
+        'overlap_cycles': overlaps,
+        'modes': modes,
+    }
+
+def group_metrics(cleaned_tasks):
+    """
+    按(size, uv, round)统计clean_pmf_tasks之后的输出指标。
+
+    参数:
+        cleaned_tasks (list): clean_pmf_tasks 返回的任务。
+
+    返回:
+        dict: 'size/uv/round' -> makespan, last_output_end, overlap_cycles, modes。
+    """
+    grouped = defaultdict(list)
+    for task in cleaned_tasks:
+        if task['output_begin'] is None or task['output_end'] is None:
+            continue
+        grouped[(get_size(task['mode']), task['uv'], task['round'])].append(task)
+
+    metrics = {}
+    for (size, uv, r), task_list in sorted(grouped.items()):
+        seen = defaultdict(int)
+        modes = {}
+        for task in task_list:
+            modes[task_key(task['mode'], seen)] = {
+                'output': task['output_end'] - task['output_begin'],
+                'output_end': task['output_end'],
+            }
+        metrics[f'{size}/{uv}/{r}'] = {
+            'makespan': max(t['output_end'] for t in task_list) - min(t['output_begin'] for t in task_list),
+            'last_output_end': max(t['output_end'] for t in task_list),
+            'overlap_cycles': overlap_cycles([(t['output_begin'], t['output_end']) for t in task_list]),
+            'modes': modes,
+        }
+    return metrics
+
+def collect_metrics(csv_dirs):
+    """
+    统计一个或多个CSV目录的全部基线指标。
+
+    每个目录对应一个类别(如 PMF_Output / 264PMF_Output)，分组指标按类别分开。
+
+    参数:
+        csv_dirs (list): CSV目录列表。
+
+    返回:
+        dict: {'sheets': {...}, 'groups': {...}}
+    """
+    result = {'sheets': {}, 'groups': {}}
+    for csv_dir in csv_dirs:
+        if not os.path.isdir(csv_dir):
+            print(f"Warning: CSV directory '{csv_dir}' not found. Skipping.")
+            continue
+        category = os.path.basename(os.path.normpath(csv_dir))
+        sheets = list_sheet_csvs(csv_dir)
+        category_tasks = []
+        for sheet, csv_file in sheets:
+            tasks, _ = read_tasks_from_csv(csv_file)
+            result['sheets'][f'{category}/{sheet}'] = sheet_metrics(tasks)
+            if 'sp' in sheet:
+                category_tasks.extend(collect_sp_tasks(csv_file, sheet))
+        sheets_normal = [(s, f) for s, f in sheets if 'sp' not in s]
+        category_tasks.extend(collect_pmf_tasks([f for _, f in sheets_normal], [s for s, _ in sheets_normal]))
+        for key, value in group_metrics(clean_pmf_tasks(category_tasks)).items():
+            result['groups'][f'{category}/{key}'] = value
+    return result
+
+def format_delta(delta):
+    return f"+{delta}" if delta > 0 else str(delta)
+
+def compare_entry(name, old, new, tolerance):
+    """
+    对比单个sheet或分组，打印差值。
+
+    返回:
+        bool: 是否变慢(超过tolerance)。
+    """
+    slower = False
+    lines = []
+    for metric in ['makespan', 'last_output_end', 'overlap_cycles']:
+        a, b = old.get(metric), new.get(metric)
+        if a is None or b is None or a == b:
+            continue
+        lines.append(f"  {metric}: {a} -> {b} ({format_delta(b - a)})")
+        if metric != 'overlap_cycles' and b - a > tolerance:
+            slower = True
+
+    for mode in sorted(set(old['modes']) | set(new['modes'])):
+        if mode not in new['modes']:
+            lines.append(f"  {mode}: removed")
+            continue
+        if mode not in old['modes']:
+            lines.append(f"  {mode}: added")
+            continue
+        deltas = []
+        for field in ['input', 'transition', 'output', 'output_end']:
+            a, b = old['modes'][mode].get(field), new['modes'][mode].get(field)
+            if a is not None and b is not None and a != b:
+                deltas.append(f"{field} {format_delta(b - a)}")
+        if deltas:
+            lines.append(f"  {mode}: {', '.join(deltas)}")
+
+    if lines:
+        status = 'SLOWER' if slower else 'changed'
+        print(f"[{status}] {name}")
+        for line in lines:
+            print(line)
+    return slower
+
+def compare_metrics(baseline, current, tolerance=0):
+    """
+    对比基线和当前指标。
+
+    参数:
+        baseline (dict): 基线指标。
+        current (dict): 当前指标。
+        tolerance (int): 允许的makespan/last_output_end增量(周期)。
+
+    返回:
+        bool: 是否存在变慢或缺失的sheet/分组。
+    """
+    regressed = False
+    for section in ['sheets', 'groups']:
+        old_section = baseline.get(section, {})
+        new_section = current.get(section, {})
+        for name in sorted(set(old_section) | set(new_section)):
+            if name not in new_section:
+                print(f"[MISSING] {section[:-1]} {name} is in the baseline but not in this run")
+                regressed = True
+            elif name not in old_section:
+                print(f"[NEW] {section[:-1]} {name} has no baseline entry")
+            elif compare_entry(name, old_section[name], new_section[name], tolerance):
+                regressed = True
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description='PMF schedule throughput regression gate')
+    mode_group = parser.add_mutually_exclusive_group(required=True)
+    mode_group.add_argument('--save', action='store_true', help='Store current metrics as the baseline')
+    mode_group.add_argument('--compare', action='store_true', help='Compare current metrics against the baseline')
+    parser.add_argument('--csv-dir', action='append', help='CSV directory produced by the batch script (repeatable)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--tolerance', type=int, default=0, help='Allowed cycle increase before failing')
+    args = parser.parse_args()
+
+    csv_dirs = args.csv_dir or ['PMF_Output', '264PMF_Output']
+    current = collect_metrics(csv_dirs)
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"Saved baseline for {len(current['sheets'])} sheets and {len(current['groups'])} groups to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"Error: baseline file '{args.baseline}' not found. Run with --save first.")
+        sys.exit(2)
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if compare_metrics(baseline, current, args.tolerance):
+        print("Schedule regression detected.")
+        sys.exit(1)
+    print("No schedule regression.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+PMF依赖图上的关键路径分析。
+
+sheet中的时间隐含了依赖：_a -> _b -> _c 链、pipe_end = input_begin、
+一个块的输出(或Input端口交接)决定下一个块的input开始。本脚本从解析后的任务建立
+依赖图(显式边 + 推断边)，以开始-开始时滞(lag)表示每条边，计算：
+- 仅由依赖决定的makespan和关键路径，以及每个任务的松弛(slack)，O(V+E)；
+- 把每个任务分别缩短N个周期后makespan的收益，一次扫描得到全部任务的结果，O((V+E) log E)。
+关键路径可通过 gantt_scheduler.py --critical-path 在甘特图中高亮。
+"""
+
+import argparse
+import csv
+import heapq
+import re
+import sys
+from collections import defaultdict
+
+from process_excel_and_generate_gantts import read_tasks_from_csv
+
+TIME_FIELDS = ['pipe_begin', 'input_begin', 'input_end', 'output_begin', 'output_end']
+
+# Inferred gating: j.input_begin (or j's first time) equal to one of these times of an earlier task i
+GATING_ANCHORS = ['output_end', 'input_end', 'output_begin']
+
+def chain_key(mode):
+    match = re.match(r'^(.*)_([abc])$', mode)
+    return (match.group(1), match.group(2)) if match else (mode, None)
+
+def build_graph(tasks, extra_edges=None):
+    """
+    从任务建立依赖图。
+
+    节点为有时间的任务(按开始时间排序，保证边只从前指向后，图无环)。边 (i, j, lag)
+    表示 start_j >= start_i + lag，lag取自实际调度中的锚点：
+    - 显式：同一链的 _a -> _b -> _c，后继input不早于前驱input结束；
+    - 显式：extra_edges 中的 (前驱mode, 后继mode)，后继input不早于前驱output结束；
+    - 推断：后继的input_begin(或最早时间)恰好等于前驱的output_end / input_end / output_begin。
+
+    参数:
+        tasks (list): read_tasks_from_csv 返回的任务。
+        extra_edges (list): 可选的 (pred_mode, succ_mode) 列表。
+
+    返回:
+        dict: tasks(原任务下标), start, duration, succ, pred, labels。
+    """
+    nodes = []
+    for index, task in enumerate(tasks):
+        times = [task[f] for f in TIME_FIELDS if task.get(f) is not None]
+        if task['mode'] and times:
+            nodes.append((min(times), index, max(times)))
+    nodes.sort()
+    n = len(nodes)
+    graph = {
+        'tasks': [index for _, index, _ in nodes],
+        'start': [start for start, _, _ in nodes],
+        'duration': [end - start for start, _, end in nodes],
+        'succ': [[] for _ in range(n)],
+        'pred': [[] for _ in range(n)],
+        'labels': [tasks[index]['mode'] for _, index, _ in nodes],
+    }
+    start = graph['start']
+    seen = set()
+
+    def add_edge(i, j, anchor_i, anchor_j):
+        if i >= j or (i, j) in seen:
+            return
+        seen.add((i, j))
+        lag = (anchor_i - start[i]) - (anchor_j - start[j])
+        graph['succ'][i].append((j, lag))
+        graph['pred'][j].append((i, lag))
+
+    node_tasks = [tasks[index] for index in graph['tasks']]
+    input_begin = [t['input_begin'] if t['input_begin'] is not None else start[k] for k, t in enumerate(node_tasks)]
+
+    # Explicit _a -> _b -> _c chains
+    chains = defaultdict(list)
+    for k, task in enumerate(node_tasks):
+        base, suffix = chain_key(task['mode'])
+        if suffix is not None:
+            chains[base].append((suffix, k))
+    for members in chains.values():
+        members.sort()
+        for (_, i), (_, j) in zip(members, members[1:]):
+            anchor = node_tasks[i]['input_end'] if node_tasks[i]['input_end'] is not None else start[i] + graph['duration'][i]
+            add_edge(i, j, anchor, input_begin[j])
+
+    # Explicit user edges: output of pred gates input of succ
+    if extra_edges:
+        by_mode = defaultdict(list)
+        for k, label in enumerate(graph['labels']):
+            by_mode[label].append(k)
+        for pred_mode, succ_mode in extra_edges:
+            for i in by_mode.get(pred_mode, []):
+                for j in by_mode.get(succ_mode, []):
+                    anchor = start[i] + graph['duration'][i]
+                    add_edge(i, j, anchor, input_begin[j])
+
+    # Inferred gating by exact time equality
+    anchors = defaultdict(list)
+    for k, task in enumerate(node_tasks):
+        for field in GATING_ANCHORS:
+            if task.get(field) is not None:
+                anchors[task[field]].append(k)
+    for j, task in enumerate(node_tasks):
+        # Gate on the input begin, or on the first known time for rows without one
+        for gate in {input_begin[j], start[j]}:
+            for i in anchors.get(gate, []):
+                add_edge(i, j, gate, gate)
+    return graph
+
+def shaved_lag(lag, cycles):
+    # Shaving a task shortens its positive outgoing lags, never below 0; negative lags stay as they are
+    return min(lag, max(lag - cycles, 0))
+
+def forward_pass(graph, shave=None):
+    """
+    最早开始时间。无前驱的节点从实际开始时间出发。
+
+    参数:
+        shave (tuple): 可选 (节点, 周期数)，该节点时长和正的出边时滞各减去相应周期(不小于0)。
+
+    返回:
+        tuple: (最早开始列表, 最早完成列表)
+    """
+    n = len(graph['start'])
+    es = [None] * n
+    ef = [0] * n
+    for j in range(n):
+        best = None
+        for i, lag in graph['pred'][j]:
+            if shave is not None and shave[0] == i:
+                lag = shaved_lag(lag, shave[1])
+            candidate = es[i] + lag
+            best = candidate if best is None or candidate > best else best
+        es[j] = graph['start'][j] if best is None else best
+        duration = graph['duration'][j]
+        if shave is not None and shave[0] == j:
+            duration = max(duration - shave[1], 0)
+        ef[j] = es[j] + duration
+    return es, ef
+
+def analyze(graph):
+    """
+    关键路径分析(节点已按拓扑序排列，O(V+E))。
+
+    返回:
+        dict: makespan, finish, es, ls, slack, path(节点列表，从前到后)。
+    """
+    n = len(graph['start'])
+    if n == 0:
+        return None
+    es, ef = forward_pass(graph)
+    begin = min(es)
+    finish = max(ef)
+
+    ls = [0] * n
+    for i in range(n - 1, -1, -1):
+        latest = finish - graph['duration'][i]
+        for j, lag in graph['succ'][i]:
+            latest = min(latest, ls[j] - lag)
+        ls[i] = latest
+    slack = [ls[k] - es[k] for k in range(n)]
+
+    # Walk back from the last finisher along tight zero-slack edges
+    node = max(range(n), key=lambda k: (ef[k], -k))
+    path = [node]
+    while True:
+        tight = [i for i, lag in graph['pred'][node] if es[i] + lag == es[node] and slack[i] == 0]
+        if not tight:
+            break
+        node = max(tight, key=lambda i: ef[i])
+        path.append(node)
+    path.reverse()
+    return {
+        'makespan': finish - begin,
+        'finish': finish,
+        'es': es,
+        'ls': ls,
+        'slack': slack,
+        'path': path,
+    }
+
+def shave_gain(graph, node, cycles, result=None):
+    """
+    把单个节点缩短cycles个周期(时长和出边时滞)后makespan减少的周期数。
+
+    重新做一次前向计算，O(V+E)；需要全部节点的收益时用 shave_gains。
+    """
+    result = result or analyze(graph)
+    if result['slack'][node] > 0:
+        # Every path through a task with slack is shorter than the makespan
+        return 0
+    _, ef = forward_pass(graph, shave=(node, cycles))
+    return result['finish'] - max(ef)
+
+def shave_gains(graph, cycles, result=None):
+    """
+    每个节点分别缩短cycles个周期后makespan减少的周期数，一次扫描，O((V+E) log E)。
+
+    节点按拓扑序编号，缩短节点v后的完成时间是两类路径长度的最大值：
+    - 经过v的路径：es[v] 不变，v之后的部分取缩短后的时长或出边时滞加上后继的尾长；
+    - 不经过v的路径：在v之前结束(前缀最大完成时间)、从v之后的源点出发(后缀最大值)，
+      或经过一条跨过v的边 (a, b)，a < v < b，长度为 es[a] + lag + tail[b]。
+    跨过v的边在从左到右扫描时用最大堆维护，b <= v 的边惰性弹出。
+    其中 tail = finish - ls 为从节点开始到结束的最长路径。
+
+    返回:
+        list: 每个节点的收益(与 shave_gain 逐个计算的结果相同)。
+    """
+    result = result or analyze(graph)
+    n = len(graph['start'])
+    if n == 0:
+        return []
+    es, finish, slack = result['es'], result['finish'], result['slack']
+    duration, succ, pred = graph['duration'], graph['succ'], graph['pred']
+    tail = [finish - ls for ls in result['ls']]
+
+    suffix_source = [float('-inf')] * (n + 1)
+    for v in range(n - 1, -1, -1):
+        source = graph['start'][v] + tail[v] if not pred[v] else float('-inf')
+        suffix_source[v] = max(suffix_source[v + 1], source)
+
+    gains = [0] * n
+    prefix_finish = float('-inf')
+    spanning = []
+    for v in range(n):
+        if v > 0:
+            for b, lag in succ[v - 1]:
+                if b > v:
+                    heapq.heappush(spanning, (-(es[v - 1] + lag + tail[b]), b))
+        while spanning and spanning[0][1] <= v:
+            heapq.heappop(spanning)
+        if slack[v] == 0:
+            avoid = max(prefix_finish, suffix_source[v + 1], -spanning[0][0] if spanning else float('-inf'))
+            through = max([max(duration[v] - cycles, 0)] + [shaved_lag(lag, cycles) + tail[j] for j, lag in succ[v]])
+            gains[v] = finish - max(avoid, es[v] + through)
+        prefix_finish = max(prefix_finish, es[v] + duration[v])
+    return gains
+
+def critical_task_indices(tasks, extra_edges=None):
+    """
+    关键路径上任务在原任务列表中的下标，供 plot_gantt 高亮。
+    """
+    graph = build_graph(tasks, extra_edges)
+    result = analyze(graph)
+    if result is None:
+        return set()
+    return {graph['tasks'][k] for k in result['path']}
+
+def read_edges(edges_file):
+    """
+    读取显式边CSV，每行 '前驱mode,后继mode'。
+    """
+    edges = []
+    with open(edges_file, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[0].strip() and not row[0].startswith('#'):
+                edges.append((row[0].replace(' ', ''), row[1].replace(' ', '')))
+    return edges
+
+def main():
+    parser = argparse.ArgumentParser(description='Critical-path analysis over the PMF dependency graph')
+    parser.add_argument('--csv-file', default='tasks.csv', help='Input task CSV file')
+    parser.add_argument('--edges', help="Extra explicit edges CSV ('pred_mode,succ_mode' per line)")
+    parser.add_argument('--shave', type=int, default=10, help='Cycles to shave off each task for the gain report')
+    args = parser.parse_args()
+
+    tasks, _ = read_tasks_from_csv(args.csv_file)
+    extra_edges = read_edges(args.edges) if args.edges else None
+    graph = build_graph(tasks, extra_edges)
+    result = analyze(graph)
+    if result is None:
+        print("No tasks to analyze.")
+        sys.exit(1)
+
+    edges = sum(len(s) for s in graph['succ'])
+    print(f"Graph: {len(graph['start'])} tasks, {edges} edges")
+    print(f"Dependency-bound makespan: {result['makespan']} cycles (finish at {result['finish']})")
+    print("Critical path:")
+    for k in result['path']:
+        print(f"  {graph['labels'][k]:<16} start {result['es'][k]:>6}  duration {graph['duration'][k]:>5}")
+    print(f"Slack and makespan gain from shaving {args.shave} cycles:")
+    gains = shave_gains(graph, args.shave, result)
+    for k in sorted(range(len(graph['start'])), key=lambda k: (result['slack'][k], result['es'][k])):
+        print(f"  {graph['labels'][k]:<16} slack {result['slack'][k]:>5}  gain {gains[k]:>4}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+每周期的端口占用与带宽曲线。
+
+plot_single_summary 只能在Summary行用红条标出重叠，看不出同时有多少个PMF输出在进行，
+也看不出c0、c1两个核合起来让共享输出通路有多忙。本脚本用NumPy差分数组
+(对开始/结束位置 np.add.at，再 cumsum)计算每个端口/分组的逐周期并发数，
+并按mode的Size乘以可配置的每周期字节数得到带宽曲线。
+结果可绘制为甘特图下方的阶梯图和热力条，也可导出为CSV(只记录变化点)。
+周期调度(PeriodicSchedule)按基础任务逐个叠加平移后的位置，可覆盖数千万周期。
+"""
+
+import argparse
+import csv
+import os
+import sys
+from collections import defaultdict
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from process_excel_and_generate_gantts import collect_pmf_tasks, collect_sp_tasks, clean_pmf_tasks, get_size
+from pmf_baseline import list_sheet_csvs
+from pmf_steady_state import load_round
+
+# Default bytes per cycle for each block size: one row of 1-byte samples per cycle
+BYTES_PER_CYCLE = {'4': 4, '8': 8, '16': 16, '32': 32, '64': 64}
+
+ALL_GROUP = 'all'
+
+def segment_intervals(tasks, segment='output'):
+    """
+    按分组收集指定段的区间。
+
+    每个Size一个分组(同Size共享端口)，另加 'all' 分组表示所有PMF任务合起来的共享通路。
+
+    参数:
+        tasks (list): 任务，需含 '{segment}_begin' / '{segment}_end'。
+        segment (str): 'input' 或 'output'。
+
+    返回:
+        dict: 分组 -> [(start, end, size), ...]
+    """
+    groups = defaultdict(list)
+    for task in tasks:
+        if not task['mode'].startswith('PMF_'):
+            continue
+        begin, end = task.get(f'{segment}_begin'), task.get(f'{segment}_end')
+        if begin is None or end is None or end <= begin:
+            continue
+        size = get_size(task['mode'])
+        groups[size].append((begin, end, size))
+        groups[ALL_GROUP].append((begin, end, size))
+    return dict(groups)
+
+def occupancy_profile(groups, weights=None, origin=None, length=None):
+    """
+    用差分数组计算每个分组的逐周期并发数和字节数。
+
+    参数:
+        groups (dict): segment_intervals 的返回值。
+        weights (dict): Size -> 每周期字节数，默认 BYTES_PER_CYCLE。
+        origin (int): 第0个采样对应的周期，默认最早开始时间。
+        length (int): 采样周期数，默认覆盖到最晚结束时间。
+
+    返回:
+        tuple: (origin, {分组: 并发数数组}, {分组: 字节数数组})
+    """
+    weights = BYTES_PER_CYCLE if weights is None else weights
+    all_intervals = [iv for intervals in groups.values() for iv in intervals]
+    if not all_intervals:
+        return 0, {}, {}
+    if origin is None:
+        origin = min(s for s, _, _ in all_intervals)
+    if length is None:
+        length = max(e for _, e, _ in all_intervals) - origin
+
+    counts = {}
+    bandwidth = {}
+    for name, intervals in groups.items():
+        starts = np.clip(np.array([s for s, _, _ in intervals], dtype=np.int64) - origin, 0, length)
+        ends = np.clip(np.array([e for _, e, _ in intervals], dtype=np.int64) - origin, 0, length)
+        w = np.array([weights.get(size, 0) for _, _, size in intervals], dtype=np.int64)
+        diff = np.zeros(length + 1, dtype=np.int32)
+        np.add.at(diff, starts, 1)
+        np.add.at(diff, ends, -1)
+        counts[name] = np.cumsum(diff[:-1], dtype=np.int32)
+        wdiff = np.zeros(length + 1, dtype=np.int64)
+        np.add.at(wdiff, starts, w)
+        np.add.at(wdiff, ends, -w)
+        bandwidth[name] = np.cumsum(wdiff[:-1])
+    return origin, counts, bandwidth
+
+def periodic_occupancy_profile(schedule, segment='output', weights=None):
+    """
+    周期调度的占用曲线，不展开任务字典。
+
+    每个基础区间在 k * period (k = 0..repeat-1) 处各加一次，差分数组长度即整个运行的周期数。
+
+    参数:
+        schedule (PeriodicSchedule): 周期调度。
+        segment (str): 'input' 或 'output'。
+        weights (dict): Size -> 每周期字节数。
+
+    返回:
+        tuple: 同 occupancy_profile。
+    """
+    weights = BYTES_PER_CYCLE if weights is None else weights
+    base_groups = segment_intervals(schedule.base, segment)
+    if not base_groups:
+        return 0, {}, {}
+    origin = schedule.begin
+    length = schedule.end - origin
+    shifts = np.arange(schedule.repeat, dtype=np.int64) * schedule.period
+    counts = {}
+    bandwidth = {}
+    for name, intervals in base_groups.items():
+        diff = np.zeros(length + 1, dtype=np.int32)
+        wdiff = np.zeros(length + 1, dtype=np.int64)
+        for s, e, size in intervals:
+            w = weights.get(size, 0)
+            np.add.at(diff, shifts + (s - origin), 1)
+            np.add.at(diff, shifts + (e - origin), -1)
+            if w:
+                np.add.at(wdiff, shifts + (s - origin), w)
+                np.add.at(wdiff, shifts + (e - origin), -w)
+        counts[name] = np.cumsum(diff[:-1], dtype=np.int32)
+        bandwidth[name] = np.cumsum(wdiff[:-1])
+    return origin, counts, bandwidth
+
+def change_points(arrays, length):
+    # Indices where any profile changes value, plus 0 and the end
+    changed = np.zeros(length, dtype=bool)
+    changed[0] = True
+    for a in arrays:
+        changed[1:] |= a[1:] != a[:-1]
+    return np.append(np.flatnonzero(changed), length)
+
+def export_csv(origin, counts, bandwidth, filename):
+    """
+    导出占用曲线CSV，每行为一段数值不变的周期区间 [cycle_begin, cycle_end)。
+    """
+    names = sorted(counts)
+    if not names:
+        return
+    length = len(counts[names[0]])
+    points = change_points([counts[n] for n in names] + [bandwidth[n] for n in names], length)
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        header = ['cycle_begin', 'cycle_end']
+        for n in names:
+            header += [f'{n}_count', f'{n}_bytes']
+        writer.writerow(header)
+        starts = points[:-1]
+        columns = [starts + origin, points[1:] + origin]
+        for n in names:
+            columns += [counts[n][starts], bandwidth[n][starts]]
+        writer.writerows(zip(*[c.tolist() for c in columns]))
+
+def heat_bins(values, bins):
+    # Max-pool a long profile down to at most `bins` columns for the heat strip
+    if len(values) <= bins:
+        return values
+    edges = np.linspace(0, len(values), bins + 1).astype(np.int64)
+    return np.maximum.reduceat(values, edges[:-1])
+
+def plot_occupancy(origin, counts, bandwidth, filename, title, groups=None, max_bars=5000):
+    """
+    绘制占用曲线：上方为各分组的段甘特(任务不超过max_bars时)，下方为并发数阶梯图和字节数热力条。
+    """
+    names = sorted(counts, key=lambda n: (n == ALL_GROUP, int(n) if n.isdigit() else 0, n))
+    if not names:
+        print("No occupancy to plot.")
+        return
+    length = len(counts[names[0]])
+    draw_bars = groups is not None and sum(len(v) for v in groups.values()) <= max_bars
+    rows = (1 if draw_bars else 0) + len(names) + 1
+    ratios = ([3] if draw_bars else []) + [1] * len(names) + [0.6]
+    fig, axes = plt.subplots(rows, 1, figsize=(19, 2 + 1.2 * rows), sharex=True, gridspec_kw={'height_ratios': ratios})
+    axes = list(np.atleast_1d(axes))
+    fig.suptitle(title)
+    x_end = origin + length
+
+    if draw_bars:
+        ax = axes.pop(0)
+        for y, name in enumerate(names):
+            bars = [(s, e - s) for s, e, _ in groups.get(name, [])]
+            ax.broken_barh(bars, (y - 0.2, 0.4), facecolors='gray' if name == ALL_GROUP else 'orange')
+        ax.set_yticks(range(len(names)))
+        ax.set_yticklabels(names)
+
+    for name in names:
+        ax = axes.pop(0)
+        points = change_points([counts[name]], length)
+        xs = points[:-1] + origin
+        ax.step(np.append(xs, x_end), np.append(counts[name][points[:-1]], 0), where='post', color='tomato' if name == ALL_GROUP else 'darkorange')
+        ax.set_ylabel(name, rotation=0, ha='right', va='center')
+        ax.set_ylim(0, max(int(counts[name].max()), 1) + 0.5)
+        ax.grid(True, axis='x')
+
+    ax = axes.pop(0)
+    strip = heat_bins(bandwidth[ALL_GROUP] if ALL_GROUP in bandwidth else bandwidth[names[0]], 4000)
+    ax.imshow(strip[np.newaxis, :], aspect='auto', cmap='inferno', extent=(origin, x_end, 0, 1), vmin=0)
+    ax.set_yticks([])
+    ax.set_ylabel(f'bytes\n(peak {int(strip.max())}/cycle)', rotation=0, ha='right', va='center')
+    ax.set_xlabel('Clock Cycles')
+    plt.xlim(origin, x_end)
+
+    if os.path.exists(filename):
+        os.remove(filename)
+    plt.savefig(filename, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+
+def load_category_round(csv_dir, r, segment='output'):
+    """
+    读取批处理CSV目录中某个round的任务(c0与c1合并)。
+
+    output 段使用与汇总图相同的清理后任务；clean_pmf_tasks 只保留输出时间，
+    且sp任务本身没有input，因此 input 段使用普通sheet未清理的 collect_pmf_tasks 结果。
+    """
+    sheets = list_sheet_csvs(csv_dir)
+    normal = [(s, f) for s, f in sheets if 'sp' not in s]
+    tasks = collect_pmf_tasks([f for _, f in normal], [s for s, _ in normal])
+    if segment == 'input':
+        return [t for t in tasks if t['round'] == r]
+    sp_tasks = []
+    for sheet, csv_file in sheets:
+        if 'sp' in sheet:
+            sp_tasks.extend(collect_sp_tasks(csv_file, sheet))
+    return [t for t in clean_pmf_tasks(sp_tasks + tasks) if t['round'] == r]
+
+def parse_weights(items):
+    weights = dict(BYTES_PER_CYCLE)
+    for item in items or []:
+        size, _, value = item.partition('=')
+        weights[size.strip()] = int(value)
+    return weights
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-cycle PMF port occupancy and bandwidth profile')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv-dir', help='Batch CSV directory; profiles one round (cleaned outputs, or raw inputs with --segment input)')
+    source.add_argument('--csv-file', nargs='+', help='Sheet CSVs to profile together')
+    parser.add_argument('--round', default='0', help="Round to profile with --csv-dir ('0' or '1')")
+    parser.add_argument('--segment', choices=['input', 'output'], default='output', help='Segment to profile')
+    parser.add_argument('--repeat', type=int, help='Repeat a single --csv-file as a periodic schedule')
+    parser.add_argument('--period', type=int, help='Period for --repeat (default: steady-state initiation interval)')
+    parser.add_argument('--bytes-per-cycle', nargs='*', metavar='SIZE=BYTES', help='Override bytes per cycle, e.g. 8=16 16=32')
+    parser.add_argument('--output', default='PMF_Occupancy', help='Output file prefix (.png and .csv)')
+    args = parser.parse_args()
+
+    weights = parse_weights(args.bytes_per_cycle)
+    groups = None
+    if args.repeat:
+        if not args.csv_file or len(args.csv_file) != 1:
+            print("Error: --repeat needs exactly one --csv-file.")
+            sys.exit(1)
+        from pmf_periodic import PeriodicSchedule
+        schedule = PeriodicSchedule.from_csv(args.csv_file[0], args.repeat, args.period)
+        origin, counts, bandwidth = periodic_occupancy_profile(schedule, args.segment, weights)
+        title = f"PMF {args.segment} occupancy, {args.repeat} rounds every {schedule.period} cycles"
+    else:
+        if args.csv_dir:
+            tasks = load_category_round(args.csv_dir, args.round, args.segment)
+            title = f"PMF {args.segment} occupancy {os.path.basename(os.path.normpath(args.csv_dir))} Round {args.round}"
+        else:
+            tasks = load_round(args.csv_file)
+            title = f"PMF {args.segment} occupancy"
+        groups = segment_intervals(tasks, args.segment)
+        origin, counts, bandwidth = occupancy_profile(groups, weights)
+
+    if not counts:
+        print("No PMF segments to profile.")
+        sys.exit(1)
+    for name in sorted(counts):
+        busy = int(np.count_nonzero(counts[name]))
+        print(f"{name}: peak {int(counts[name].max())} concurrent, busy {busy} cycles, "
+              f"peak {int(bandwidth[name].max())} bytes/cycle, total {int(bandwidth[name].sum())} bytes")
+    export_csv(origin, counts, bandwidth, f'{args.output}.csv')
+    plot_occupancy(origin, counts, bandwidth, f'{args.output}.png', title, groups)
+    print(f"Saved {args.output}.csv and {args.output}.png")
+
+if __name__ == "__main__":
+    main()
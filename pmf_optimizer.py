@@ -0,0 +1,242 @@
+"""
+PMF块调度自动优化。
+
+从任务CSV读取每个PMF mode的pipe/input/transition/output时长，
+按 _a -> _b -> _c 命名推导先后约束(后继的input不早于前驱的input结束)，
+用列表调度 + 局部搜索(插入移动、随机重启)寻找最小makespan的顺序和开始时间：
+所有PMF任务共享一个Input端口，同Size的任务共享一个Output端口，均不允许重叠。
+结果写成任务CSV，可直接交给 gantt_scheduler.py 绘制。
+"""
+
+import argparse
+import csv
+import random
+import re
+import sys
+
+from process_excel_and_generate_gantts import read_tasks_from_csv, get_size
+
+def chain_key(mode):
+    """
+    拆分mode的链名和子任务后缀。
+
+    'PMF_M8_0_b' -> ('PMF_M8_0', 'b')，无后缀时返回 (mode, None)。
+    """
+    match = re.match(r'^(.*)_([abc])$', mode)
+    if match:
+        return match.group(1), match.group(2)
+    return mode, None
+
+def build_jobs(tasks):
+    """
+    从任务中提取调度所需的时长和先后约束。
+
+    参数:
+        tasks (list): read_tasks_from_csv 返回的任务。
+
+    返回:
+        list: job字典(mode, size, pipe, input, transition, output, preds)，
+              顺序与输入一致。
+    """
+    jobs = []
+    for task in tasks:
+        if not task['mode'].startswith('PMF_'):
+            continue
+        if task['input_begin'] is None or task['input_end'] is None or task['output_begin'] is None or task['output_end'] is None:
+            print(f"Warning: mode '{task['mode']}' has incomplete times. Skipping.")
+            continue
+        pipe = task['input_begin'] - task['pipe_begin'] if task['pipe_begin'] is not None else 0
+        jobs.append({
+            'mode': task['mode'],
+            'size': get_size(task['mode']),
+            'pipe': max(pipe, 0),
+            'input': task['input_end'] - task['input_begin'],
+            'transition': task['output_begin'] - task['input_end'],
+            'output': task['output_end'] - task['output_begin'],
+            'preds': [],
+            'orig_input_begin': task['input_begin'],
+        })
+
+    # _a -> _b -> _c within the same chain
+    chains = {}
+    for i, job in enumerate(jobs):
+        base, suffix = chain_key(job['mode'])
+        if suffix is not None:
+            chains.setdefault(base, []).append((suffix, i))
+    for members in chains.values():
+        members.sort()
+        for (_, prev), (_, cur) in zip(members, members[1:]):
+            jobs[cur]['preds'].append(prev)
+    return jobs
+
+def find_conflict(busy, begin, end):
+    # busy is a list of (begin, end); returns the end of the first interval overlapping [begin, end)
+    for b, e in busy:
+        if b < end and begin < e:
+            return e
+    return None
+
+def list_schedule(jobs, order):
+    """
+    按给定优先顺序做列表调度。
+
+    每个任务放在满足先后约束、且Input/Output端口都空闲的最早input开始时间。
+
+    参数:
+        jobs (list): build_jobs 返回的job。
+        order (list): job下标的拓扑顺序。
+
+    返回:
+        dict: 下标 -> input开始时间。
+    """
+    starts = {}
+    input_busy = []
+    output_busy = {}
+    for i in order:
+        job = jobs[i]
+        out_offset = job['input'] + job['transition']
+        earliest = max(job['pipe'], -out_offset)
+        for p in job['preds']:
+            earliest = max(earliest, starts[p] + jobs[p]['input'])
+        port = output_busy.setdefault(job['size'], [])
+        s = earliest
+        while True:
+            conflict = find_conflict(input_busy, s, s + job['input']) if job['input'] > 0 else None
+            if conflict is not None:
+                s = conflict
+                continue
+            conflict = find_conflict(port, s + out_offset, s + out_offset + job['output']) if job['output'] > 0 else None
+            if conflict is not None:
+                s = conflict - out_offset
+                continue
+            break
+        starts[i] = s
+        input_busy.append((s, s + job['input']))
+        port.append((s + out_offset, s + out_offset + job['output']))
+    return starts
+
+def evaluate(jobs, starts):
+    """
+    计算调度的代价 (makespan, output_end之和)，后者用于打破平局。
+    """
+    begin = min(starts[i] - jobs[i]['pipe'] for i in starts)
+    ends = [starts[i] + jobs[i]['input'] + jobs[i]['transition'] + jobs[i]['output'] for i in starts]
+    ends += [starts[i] + jobs[i]['input'] for i in starts]
+    return max(ends) - begin, sum(ends)
+
+def is_topological(jobs, order):
+    position = {i: k for k, i in enumerate(order)}
+    return all(position[p] < position[i] for i in order for p in jobs[i]['preds'])
+
+def local_search(jobs, order):
+    """
+    对优先顺序做插入移动的首次改进局部搜索，直到局部最优。
+
+    返回:
+        tuple: (顺序, 开始时间, 代价)
+    """
+    starts = list_schedule(jobs, order)
+    cost = evaluate(jobs, starts)
+    improved = True
+    while improved:
+        improved = False
+        for src in range(len(order)):
+            for dst in range(len(order)):
+                if src == dst:
+                    continue
+                candidate = order[:src] + order[src + 1:]
+                candidate.insert(dst, order[src])
+                if not is_topological(jobs, candidate):
+                    continue
+                cand_starts = list_schedule(jobs, candidate)
+                cand_cost = evaluate(jobs, cand_starts)
+                if cand_cost < cost:
+                    order, starts, cost = candidate, cand_starts, cand_cost
+                    improved = True
+                    break
+            if improved:
+                break
+    return order, starts, cost
+
+def random_topological_order(jobs, rng):
+    remaining = set(range(len(jobs)))
+    order = []
+    while remaining:
+        ready = sorted(i for i in remaining if all(p not in remaining for p in jobs[i]['preds']))
+        pick = rng.choice(ready)
+        order.append(pick)
+        remaining.remove(pick)
+    return order
+
+def optimize(jobs, restarts=20, seed=0):
+    """
+    最小化makespan。
+
+    以手工顺序(按原input开始时间)为起点做局部搜索，再做若干次随机拓扑顺序重启，
+    返回最优结果。
+
+    参数:
+        jobs (list): build_jobs 返回的job。
+        restarts (int): 随机重启次数。
+        seed (int): 随机种子。
+
+    返回:
+        tuple: (开始时间字典, (makespan, output_end之和))
+    """
+    rng = random.Random(seed)
+    initial = sorted(range(len(jobs)), key=lambda i: jobs[i]['orig_input_begin'])
+    if not is_topological(jobs, initial):
+        initial = random_topological_order(jobs, rng)
+    _, best_starts, best_cost = local_search(jobs, initial)
+    for _ in range(restarts):
+        _, starts, cost = local_search(jobs, random_topological_order(jobs, rng))
+        if cost < best_cost:
+            best_starts, best_cost = starts, cost
+    return best_starts, best_cost
+
+def original_makespan(jobs):
+    starts = {i: job['orig_input_begin'] for i, job in enumerate(jobs)}
+    return evaluate(jobs, starts)[0]
+
+def write_schedule_csv(jobs, starts, config, output_file):
+    """
+    把优化结果写成 gantt_scheduler.py 可读的任务CSV(绝对时间)。
+    """
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['tile', f"{config.get('tile', 'PMF')} optimized"])
+        writer.writerow(['x', config.get('x', 'CYCLE')])
+        writer.writerow(['y', config.get('y', 'MODE')])
+        writer.writerow(['mode', 'pipe begin', 'input begin', 'input end', 'output begin', 'output end'])
+        for i in sorted(starts, key=lambda k: (starts[k], k)):
+            job = jobs[i]
+            s = starts[i]
+            input_end = s + job['input']
+            output_begin = input_end + job['transition']
+            writer.writerow([job['mode'], s - job['pipe'], s, input_end, output_begin, output_begin + job['output']])
+
+def main():
+    parser = argparse.ArgumentParser(description='Makespan-minimizing scheduler for PMF blocks')
+    parser.add_argument('--csv-file', default='tasks.csv', help='Input task CSV file')
+    parser.add_argument('--output', default='tasks_optimized.csv', help='Output task CSV file')
+    parser.add_argument('--restarts', type=int, default=20, help='Random restarts for the local search')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    tasks, config = read_tasks_from_csv(args.csv_file)
+    jobs = build_jobs(tasks)
+    if not jobs:
+        print("No PMF tasks to schedule.")
+        sys.exit(1)
+    skipped = sum(1 for t in tasks if t['mode'] and not t['mode'].startswith('PMF_'))
+    if skipped:
+        print(f"Note: {skipped} non-PMF rows are not part of the optimized schedule.")
+
+    starts, (makespan, _) = optimize(jobs, args.restarts, args.seed)
+    print(f"Original makespan: {original_makespan(jobs)}")
+    print(f"Optimized makespan: {makespan}")
+    write_schedule_csv(jobs, starts, config, args.output)
+    print(f"Saved optimized schedule to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+长时间多round运行的周期调度表示。
+
+collect_pmf_tasks 为每个round复制一份任务字典，模拟一整帧(成千上万个CTU round)
+会产生数百万条几乎相同的记录。PeriodicSchedule 只保存一份基础任务集、周期和重复次数：
+- window(start, end) 惰性产出与周期窗口相交的任务，按开始时间排序；
+- metrics() 解析地计算整个运行的makespan、各端口占用与重叠周期；
+- render(start, end, output_file) 按需绘制任意周期窗口的甘特图。
+内存为 O(基础任务数)，与round数无关。
+"""
+
+import argparse
+import heapq
+import sys
+from argparse import Namespace
+
+from process_excel_and_generate_gantts import read_tasks_from_csv
+from pmf_steady_state import port_intervals, analyze
+
+TIME_FIELDS = ['pipe_begin', 'pipe_end', 'input_begin', 'input_end', 'output_begin', 'output_end']
+
+def task_span(task):
+    times = [task[f] for f in TIME_FIELDS if task.get(f) is not None]
+    return (min(times), max(times)) if times else (None, None)
+
+def coverage_cycles(intervals, depth):
+    """
+    扫描线统计至少有depth个区间同时占用的周期数。
+
+    参数:
+        intervals (list): (start, end) 列表。
+        depth (int): 1 为占用周期，2 为重叠周期。
+
+    返回:
+        int: 周期数。
+    """
+    events = []
+    for s, e in intervals:
+        if e > s:
+            events.append((s, 1))
+            events.append((e, -1))
+    events.sort()
+    total = 0
+    active = 0
+    last = None
+    for t, delta in events:
+        if active >= depth:
+            total += t - last
+        active += delta
+        last = t
+    return total
+
+class PeriodicSchedule:
+    """
+    基础任务集按固定周期重复 repeat 次的调度。
+
+    第k个round的任务为基础任务整体平移 k * period，mode追加 '_{k}' 后缀，
+    并带 'round' 字段，与 collect_pmf_tasks 的命名方式一致。
+    """
+
+    def __init__(self, base_tasks, period, repeat, config=None):
+        if period <= 0:
+            raise ValueError(f"period must be positive, got {period}")
+        if repeat <= 0:
+            raise ValueError(f"repeat must be positive, got {repeat}")
+        self.base = sorted((t for t in base_tasks if task_span(t)[0] is not None), key=lambda t: task_span(t)[0])
+        if not self.base:
+            raise ValueError("base schedule has no timed tasks")
+        self.period = period
+        self.repeat = repeat
+        self.config = config or {}
+        self._starts = [task_span(t)[0] for t in self.base]
+        self._ends = [task_span(t)[1] for t in self.base]
+        self.base_begin = self._starts[0]
+        self.base_end = max(self._ends)
+
+    @classmethod
+    def from_csv(cls, csv_file, repeat, period=None):
+        """
+        从任务CSV构建；未指定period时使用稳态分析得到的最小启动间隔。
+        """
+        tasks, config = read_tasks_from_csv(csv_file)
+        if period is None:
+            result = analyze(tasks)
+            if result is None:
+                raise ValueError(f"no PMF tasks in '{csv_file}' to derive a period from")
+            period = result['initiation_interval']
+        return cls(tasks, period, repeat, config)
+
+    def __len__(self):
+        return len(self.base) * self.repeat
+
+    @property
+    def begin(self):
+        return self.base_begin
+
+    @property
+    def end(self):
+        return (self.repeat - 1) * self.period + self.base_end
+
+    def task(self, k, i):
+        """
+        第k个round的第i个基础任务(已平移)。
+        """
+        base = self.base[i]
+        shift = k * self.period
+        task = {**base, 'mode': f"{base['mode']}_{k}", 'round': str(k), 'original_mode': base['mode']}
+        for field in TIME_FIELDS:
+            if base.get(field) is not None:
+                task[field] = base[field] + shift
+        return task
+
+    def _round_range(self, start, end):
+        # Rounds k whose [base_begin, base_end] shifted by k*period intersects [start, end)
+        first = max(0, (start - self.base_end) // self.period + 1)
+        last = min(self.repeat - 1, (end - 1 - self.base_begin) // self.period)
+        return first, last
+
+    def window(self, start=None, end=None):
+        """
+        惰性产出与 [start, end) 相交的任务，按开始时间排序。
+
+        只有同时活跃的round(约 span/period 个)会留在堆中，整个运行也可以流式遍历。
+        """
+        start = self.begin if start is None else start
+        end = self.end + 1 if end is None else end
+        first, last = self._round_range(start, end)
+        if last < first:
+            return
+        heap = []
+        next_k = first
+        while True:
+            while next_k <= last and (not heap or next_k * self.period + self._starts[0] <= heap[0][0]):
+                heapq.heappush(heap, (next_k * self.period + self._starts[0], next_k, 0))
+                next_k += 1
+            if not heap:
+                return
+            t, k, i = heapq.heappop(heap)
+            if t >= end:
+                return
+            if i + 1 < len(self.base):
+                heapq.heappush(heap, (k * self.period + self._starts[i + 1], k, i + 1))
+            if t >= start or k * self.period + self._ends[i] > start:
+                yield self.task(k, i)
+
+    def _port_cycles(self, rounds):
+        # Materialize only `rounds` rounds of port intervals
+        shifted = []
+        for k in range(rounds):
+            shifted.extend(self.task(k, i) for i in range(len(self.base)))
+        ports = port_intervals(shifted)
+        return {name: (coverage_cycles(iv, 1), coverage_cycles(iv, 2)) for name, iv in ports.items()}
+
+    def port_metrics(self):
+        """
+        整个运行中每个端口的占用周期和重叠周期。
+
+        超过 2M+2 个round(M = ceil(span/period))后，每增加一个round只增加一个
+        稳态周期的贡献，因此只需展开两个小规模运行，再线性外推。
+
+        返回:
+            dict: 端口名 -> {'busy_cycles': n, 'overlap_cycles': n}
+        """
+        span = self.base_end - self.base_begin
+        overlap_rounds = -(-span // self.period)
+        r0 = 2 * overlap_rounds + 2
+        if self.repeat <= r0:
+            cycles = self._port_cycles(self.repeat)
+            return {name: {'busy_cycles': b, 'overlap_cycles': o} for name, (b, o) in cycles.items()}
+        head = self._port_cycles(r0)
+        step = self._port_cycles(r0 + 1)
+        extra = self.repeat - r0
+        result = {}
+        for name in step:
+            b0, o0 = head.get(name, (0, 0))
+            b1, o1 = step[name]
+            result[name] = {
+                'busy_cycles': b0 + extra * (b1 - b0),
+                'overlap_cycles': o0 + extra * (o1 - o0),
+            }
+        return result
+
+    def metrics(self):
+        """
+        整个运行的汇总指标。
+
+        返回:
+            dict: rounds, period, tasks, makespan, last_output_end, ports。
+        """
+        output_ends = [t['output_end'] for t in self.base if t.get('output_end') is not None]
+        return {
+            'rounds': self.repeat,
+            'period': self.period,
+            'tasks': len(self),
+            'makespan': self.end - self.begin,
+            'last_output_end': (self.repeat - 1) * self.period + max(output_ends) if output_ends else None,
+            'ports': self.port_metrics(),
+        }
+
+    def overlaps(self, start=None, end=None):
+        """
+        窗口内各端口的重叠区间(只展开窗口内的任务)。
+
+        返回:
+            dict: 端口名 -> [(start, end), ...]
+        """
+        ports = port_intervals(list(self.window(start, end)))
+        result = {}
+        for name, intervals in ports.items():
+            # Ends sort before starts at the same cycle, so touching segments do not count
+            events = sorted([(s, 1) for s, _ in intervals] + [(e, -1) for _, e in intervals])
+            active = 0
+            opened = None
+            merged = []
+            for t, delta in events:
+                previous = active
+                active += delta
+                if previous < 2 <= active:
+                    opened = t
+                elif active < 2 <= previous and t > opened:
+                    if merged and opened <= merged[-1][1]:
+                        merged[-1] = (merged[-1][0], t)
+                    else:
+                        merged.append((opened, t))
+            if merged:
+                result[name] = merged
+        return result
+
+    def render(self, start, end, output_file):
+        """
+        用 gantt_scheduler.plot_gantt 绘制 [start, end) 窗口内的任务。
+        """
+        import gantt_scheduler
+        tasks = list(self.window(start, end))
+        if not tasks:
+            print(f"No tasks in window [{start}, {end}).")
+            return
+        config = dict(self.config)
+        config['tile'] = f"{config.get('tile', 'PMF')} cycles {start}-{end}"
+        gantt_scheduler.plot_gantt(tasks, config, Namespace(output=output_file, save_only=True))
+
+def main():
+    parser = argparse.ArgumentParser(description='Periodic multi-round PMF schedule')
+    parser.add_argument('--csv-file', default='tasks.csv', help='Base round task CSV file')
+    parser.add_argument('--repeat', type=int, default=1000, help='Number of rounds')
+    parser.add_argument('--period', type=int, help='Cycles between rounds (default: steady-state initiation interval)')
+    parser.add_argument('--window', type=int, nargs=2, metavar=('START', 'END'), help='Cycle window to render')
+    parser.add_argument('--output', default='PMF_Periodic_window.png', help='Output PNG for --window')
+    args = parser.parse_args()
+
+    try:
+        schedule = PeriodicSchedule.from_csv(args.csv_file, args.repeat, args.period)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    metrics = schedule.metrics()
+    print(f"Rounds: {metrics['rounds']}, period: {metrics['period']} cycles, tasks: {metrics['tasks']}")
+    print(f"Makespan: {metrics['makespan']} cycles, last output_end: {metrics['last_output_end']}")
+    for name, port in sorted(metrics['ports'].items()):
+        print(f"  {name}: busy {port['busy_cycles']} cycles, overlap {port['overlap_cycles']} cycles")
+
+    if args.window:
+        start, end = args.window
+        schedule.render(start, end, args.output)
+        print(f"Saved window {start}-{end} to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+重复round的稳态启动间隔(initiation interval)分析。
+
+把一个round的调度看作预约表：每个端口(每个sheet的PMF Input端口、每个Size的
+PMF Output端口)在该round中占用若干区间。round k+m 相对 round k 平移 m*P，
+若两者在某个端口上重叠即冲突。脚本解析地求出禁止的平移量集合，进而得到：
+- 最小相邻延迟：round k+1 不与 round k 冲突的最小平移量；
+- 稳态启动间隔II：对所有 m >= 1，m*II 都不冲突的最小周期；
+- 对应的吞吐量(每千周期的块数)。
+无需展开成成千上万个round再绘图。
+"""
+
+import argparse
+import bisect
+import os
+import sys
+from collections import defaultdict
+
+from process_excel_and_generate_gantts import read_tasks_from_csv, get_size, merge_intervals
+
+def port_intervals(tasks):
+    """
+    按端口收集一个round内的占用区间。
+
+    所有PMF任务的Input段按sheet共享一个Input端口，Output段按Size共享Output端口，
+    与 gantt_scheduler.py 和汇总图的冲突规则一致。
+
+    参数:
+        tasks (list): 任务，可带'sheet'字段区分不同核。
+
+    返回:
+        dict: 端口名 -> [(start, end), ...]
+    """
+    ports = defaultdict(list)
+    for task in tasks:
+        if not task['mode'].startswith('PMF_'):
+            continue
+        ib, ie = task.get('input_begin'), task.get('input_end')
+        if ib is not None and ie is not None and ie > ib:
+            ports[f"input {task.get('sheet', '')}".strip()].append((ib, ie))
+        ob, oe = task.get('output_begin'), task.get('output_end')
+        if ob is not None and oe is not None and oe > ob:
+            ports[f"output {get_size(task['mode'])}"].append((ob, oe))
+    return dict(ports)
+
+def forbidden_latencies(ports):
+    """
+    计算导致端口冲突的平移量集合。
+
+    round k 的区间 [s_i, e_i) 与平移P后的 [s_j + P, e_j + P) 重叠当且仅当
+    s_i - e_j < P < e_i - s_j。对同一端口的所有区间对取并集，只保留 P > 0 部分。
+
+    参数:
+        ports (dict): port_intervals 的返回值。
+
+    返回:
+        list: 合并后的整数闭区间 [lo, hi]，按lo排序。
+    """
+    ranges = []
+    for intervals in ports.values():
+        for s_i, e_i in intervals:
+            for s_j, e_j in intervals:
+                lo, hi = max(s_i - e_j + 1, 1), e_i - s_j - 1
+                if lo <= hi:
+                    ranges.append((lo, hi))
+    if not ranges:
+        return []
+    ranges.sort()
+    merged = [ranges[0]]
+    for lo, hi in ranges[1:]:
+        last_lo, last_hi = merged[-1]
+        if lo <= last_hi + 1:
+            merged[-1] = (last_lo, max(last_hi, hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+def is_forbidden(forbidden, latency):
+    k = bisect.bisect_right(forbidden, (latency, float('inf'))) - 1
+    return k >= 0 and latency <= forbidden[k][1]
+
+def resource_bound(ports):
+    """
+    资源下界：任一端口在一个round内的总占用周期数，II不可能小于它。
+    """
+    bound = 1
+    for intervals in ports.values():
+        busy = sum(e - s for s, e in merge_intervals(list(intervals)))
+        bound = max(bound, busy)
+    return bound
+
+def analyze(tasks, blocks_per_round=1):
+    """
+    对一个round的调度做稳态分析。
+
+    参数:
+        tasks (list): 一个round的任务。
+        blocks_per_round (int): 每个round处理的块数，用于换算吞吐量。
+
+    返回:
+        dict: round_span, resource_bound, min_latency, initiation_interval,
+              blocks_per_kilocycle, bottleneck_ports；无PMF任务时返回None。
+    """
+    ports = port_intervals(tasks)
+    if not ports:
+        return None
+    all_intervals = [iv for intervals in ports.values() for iv in intervals]
+    span = max(e for _, e in all_intervals) - min(s for s, _ in all_intervals)
+    forbidden = forbidden_latencies(ports)
+    max_forbidden = forbidden[-1][1] if forbidden else 0
+
+    lower = resource_bound(ports)
+    min_latency = 1
+    while is_forbidden(forbidden, min_latency):
+        min_latency += 1
+
+    # Constant period P is feasible when no multiple m*P falls in a forbidden interval;
+    # multiples at or beyond the largest forbidden latency can never conflict.
+    ii = max(lower, min_latency)
+    while any(is_forbidden(forbidden, m * ii) for m in range(1, max_forbidden // ii + 1)):
+        ii += 1
+
+    bottlenecks = [name for name, intervals in ports.items()
+                   if sum(e - s for s, e in merge_intervals(list(intervals))) == lower]
+    return {
+        'round_span': span,
+        'resource_bound': lower,
+        'min_latency': min_latency,
+        'initiation_interval': ii,
+        'blocks_per_kilocycle': blocks_per_round * 1000 / ii,
+        'bottleneck_ports': sorted(bottlenecks),
+    }
+
+def load_round(csv_files):
+    """
+    读取组成一个round的sheet CSV，任务带上sheet名以区分各核的Input端口。
+    """
+    tasks = []
+    for csv_file in csv_files:
+        sheet = os.path.splitext(os.path.basename(csv_file))[0]
+        sheet_tasks, _ = read_tasks_from_csv(csv_file)
+        for task in sheet_tasks:
+            task['sheet'] = sheet
+            tasks.append(task)
+    return tasks
+
+def main():
+    parser = argparse.ArgumentParser(description='Steady-state initiation interval of repeated PMF rounds')
+    parser.add_argument('csv_files', nargs='+', help='Sheet CSVs that together form one round')
+    parser.add_argument('--blocks-per-round', type=int, default=1, help='Blocks processed per round')
+    args = parser.parse_args()
+
+    result = analyze(load_round(args.csv_files), args.blocks_per_round)
+    if result is None:
+        print("No PMF tasks found.")
+        sys.exit(1)
+    print(f"Round span:            {result['round_span']} cycles")
+    print(f"Resource bound:        {result['resource_bound']} cycles ({', '.join(result['bottleneck_ports'])})")
+    print(f"Min next-round latency: {result['min_latency']} cycles")
+    print(f"Initiation interval:   {result['initiation_interval']} cycles")
+    print(f"Throughput:            {result['blocks_per_kilocycle']:.3f} blocks/kilocycle")
+
+if __name__ == "__main__":
+    main()
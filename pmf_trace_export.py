@@ -0,0 +1,259 @@
+"""
+把调度导出为 Chrome trace-event JSON，供 Perfetto / chrome://tracing 打开。
+
+几十万个段的调度用 plot_gantt 生成的PNG既看不清也很慢。本脚本逐个任务流式写出
+pipe/input/transition/output 段：每个sheet为一个进程，每个mode的每种段各一条轨道，
+另有 PMF_INPUT 和每个Size一条 PMF_OUTPUT 汇总轨道；每对重叠的端口段写成一个瞬时事件。
+同一轨道上的 'X' 事件必须正确嵌套，所以与轨道上已有段重叠的段会放到该轨道的下一条泳道(lane)。
+写出是增量的。周期调度按开始时间产出任务，内存只与不同mode的数量和同时活跃的端口段数有关，
+与事件数无关；CSV的行不保证有序，冲突检测保留该CSV的全部端口段，写完一个CSV即释放。
+1个时钟周期记为1微秒。
+"""
+
+import argparse
+import bisect
+import gzip
+import heapq
+import json
+import os
+import sys
+from collections import defaultdict
+
+from process_excel_and_generate_gantts import iter_tasks_from_csv, get_size
+
+# Track ranks order the tracks in the UI: PMF_INPUT, PMF_OUTPUT per size, then the mode tracks
+PMF_INPUT_RANK = 0
+FIRST_MODE_RANK = 10
+LANE_STRIDE = 1000
+
+SEGMENTS = [
+    ('pipe', 'pipe_begin', 'pipe_end'),
+    ('input', 'input_begin', 'input_end'),
+    ('transition', 'input_end', 'output_begin'),
+    ('output', 'output_begin', 'output_end'),
+]
+
+class TraceWriter:
+    """
+    增量写出 trace-event JSON。
+
+    每个事件立即序列化写入文件；只保存每条轨道各泳道的最晚结束时间和每个端口上的段(按结束时间的堆)。
+    每条泳道记录其上互不重叠的段(按开始时间排序)，新段放到第一条与之不重叠的泳道，
+    与到达顺序无关，只有真正重叠的段才会占用额外泳道。ordered=True 时泳道也按水位丢弃已结束的段。
+    ordered=True 表示调用者保证每个进程的任务按最早时间顺序到达(周期调度的窗口即如此)：
+    任务的各段不早于任务的最早时间，结束时间不晚于当前任务开始的段不会再与后续段重叠，可以丢弃；
+    此时乱序到达的任务会引发 ValueError。ordered=False 时不丢弃任何段，由 finish_process 整体释放。
+    """
+
+    def __init__(self, file, ordered=False):
+        self.file = file
+        self.first = True
+        self.pids = {}
+        self.ranks = {}
+        self.lanes = {}
+        self.next_tid = defaultdict(int)
+        self.track_rank = defaultdict(lambda: FIRST_MODE_RANK)
+        self.output_rank = defaultdict(lambda: PMF_INPUT_RANK + 1)
+        self.port_active = {}
+        self.ordered = ordered
+        self.watermark = {}
+        self.events = 0
+        self.conflicts = 0
+        self.file.write('{"displayTimeUnit":"ns","traceEvents":[')
+
+    def emit(self, event):
+        self.file.write(('' if self.first else ',') + '\n' + json.dumps(event, separators=(',', ':')))
+        self.first = False
+        self.events += 1
+
+    def emit_span(self, name, cat, pid, tid, begin, end, mode_json=None):
+        # Hot path for 'X' events: format directly instead of going through json.dumps
+        args = f',"args":{{"mode":{mode_json}}}' if mode_json else ''
+        self.file.write(f'{"" if self.first else ","}\n{{"ph":"X","name":{name},"cat":"{cat}","pid":{pid},"tid":{tid},"ts":{begin},"dur":{end - begin}{args}}}')
+        self.first = False
+        self.events += 1
+
+    def pid(self, process):
+        if process not in self.pids:
+            pid = len(self.pids) + 1
+            self.pids[process] = pid
+            self.emit({'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': 0, 'args': {'name': process}})
+        return self.pids[process]
+
+    def mode_ranks(self, pid, mode):
+        # One rank per segment kind, allocated together so a mode's tracks stay adjacent
+        key = (pid, 'mode', mode)
+        if key not in self.ranks:
+            self.ranks[key] = self.track_rank[pid]
+            self.track_rank[pid] += len(SEGMENTS)
+        return self.ranks[key]
+
+    def output_track(self, pid, size):
+        key = (pid, 'output', size)
+        if key not in self.ranks:
+            self.ranks[key] = self.output_rank[pid]
+            self.output_rank[pid] += 1
+        return self.ranks[key]
+
+    def lane(self, pid, name, rank, begin, end):
+        """
+        返回段 [begin, end) 所在泳道的tid；没有空闲泳道时新建一条并写出轨道元数据。
+        """
+        key = (pid, name)
+        lanes = self.lanes.get(key)
+        if lanes is None:
+            lanes = self.lanes[key] = []
+        for tid, segments in lanes:
+            if self.ordered:
+                # Nothing later can begin before the watermark, so earlier segments never block again
+                drop = bisect.bisect_right(segments, (self.watermark[pid], float('inf')))
+                while drop and segments[drop - 1][1] > self.watermark[pid]:
+                    drop -= 1
+                del segments[:drop]
+            k = bisect.bisect_left(segments, (begin, end))
+            if (k == 0 or segments[k - 1][1] <= begin) and (k == len(segments) or end <= segments[k][0]):
+                segments.insert(k, (begin, end))
+                return tid
+        self.next_tid[pid] += 1
+        tid = self.next_tid[pid]
+        lanes.append((tid, [(begin, end)]))
+        label = name if len(lanes) == 1 else f'{name} #{len(lanes)}'
+        self.emit({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': tid, 'args': {'name': label}})
+        self.emit({'ph': 'M', 'name': 'thread_sort_index', 'pid': pid, 'tid': tid,
+                   'args': {'sort_index': rank * LANE_STRIDE + len(lanes) - 1}})
+        return tid
+
+    def advance(self, pid, start):
+        # Segments are only evicted against this watermark, so an out-of-order task would hide conflicts
+        previous = self.watermark.get(pid)
+        if previous is not None and start < previous:
+            raise ValueError(f"task starting at {start} arrived after a task starting at {previous}; "
+                             "ordered=True needs tasks in start order")
+        self.watermark[pid] = start
+
+    def check_port(self, pid, port, tid, mode, begin, end):
+        # One conflict event per earlier segment on this port that overlaps [begin, end)
+        active = self.port_active.setdefault((pid, port), [])
+        if self.ordered:
+            while active and active[0][0] <= self.watermark[pid]:
+                heapq.heappop(active)
+        for other_end, other_begin, other_mode in active:
+            if other_begin < end and begin < other_end:
+                self.conflicts += 1
+                overlap_begin = max(begin, other_begin)
+                self.emit({'ph': 'i', 's': 't', 'name': f'{port} overlap', 'cat': 'conflict', 'pid': pid, 'tid': tid, 'ts': overlap_begin,
+                           'args': {'modes': [other_mode, mode], 'begin': overlap_begin, 'end': min(end, other_end)}})
+        heapq.heappush(active, (end, begin, mode))
+
+    def add_task(self, process, task):
+        """
+        写出一个任务的所有段，以及汇总轨道和冲突事件。
+        """
+        mode = task['mode']
+        if not mode:
+            return
+        pid = self.pid(process)
+        track = task.get('original_mode', mode)
+        first_rank = self.mode_ranks(pid, track)
+        is_pmf = mode.startswith('PMF_')
+        if is_pmf and self.ordered:
+            times = [task[f] for f in ('pipe_begin', 'pipe_end', 'input_begin', 'input_end', 'output_begin', 'output_end')
+                     if task.get(f) is not None]
+            if times:
+                self.advance(pid, min(times))
+        mode_json = json.dumps(mode)
+        for kind, (name, begin_field, end_field) in enumerate(SEGMENTS):
+            begin, end = task.get(begin_field), task.get(end_field)
+            if begin is None or end is None or end <= begin:
+                continue
+            tid = self.lane(pid, f'{track} {name}', first_rank + kind, begin, end)
+            self.emit_span(f'"{name}"', name, pid, tid, begin, end, mode_json)
+            if not is_pmf:
+                continue
+            if name == 'input':
+                tid = self.lane(pid, 'PMF_INPUT', PMF_INPUT_RANK, begin, end)
+                self.emit_span(mode_json, 'input', pid, tid, begin, end)
+                self.check_port(pid, 'input', tid, mode, begin, end)
+            elif name == 'output':
+                size = get_size(mode)
+                tid = self.lane(pid, f'PMF_OUTPUT {size}', self.output_track(pid, size), begin, end)
+                self.emit_span(mode_json, 'output', pid, tid, begin, end)
+                self.check_port(pid, f'output {size}', tid, mode, begin, end)
+
+    def finish_process(self, process):
+        """
+        释放一个进程的端口段和泳道中的段；之后该进程的段不再参与冲突检测和泳道分配。
+        """
+        pid = self.pids.get(process)
+        for key in [key for key in self.port_active if key[0] == pid]:
+            del self.port_active[key]
+        for key, lanes in self.lanes.items():
+            if key[0] == pid:
+                for _, segments in lanes:
+                    segments.clear()
+
+    def close(self):
+        self.file.write('\n]}\n')
+
+def open_output(filename):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wt', encoding='utf-8')
+    return open(filename, 'w', encoding='utf-8')
+
+def export_csv_files(csv_files, output_file):
+    """
+    流式导出一个或多个任务CSV，每个CSV为一个进程。
+
+    返回:
+        TraceWriter: 已关闭的写出器(含事件数和冲突数统计)。
+    """
+    with open_output(output_file) as f:
+        writer = TraceWriter(f)
+        for csv_file in csv_files:
+            process = os.path.splitext(os.path.basename(csv_file))[0]
+            for task in iter_tasks_from_csv(csv_file):
+                writer.add_task(process, task)
+            writer.finish_process(process)
+        writer.close()
+    return writer
+
+def export_periodic(schedule, process, output_file, start=None, end=None):
+    """
+    流式导出周期调度(或其中一个周期窗口)，不展开整个运行。
+    """
+    with open_output(output_file) as f:
+        # window() yields tasks in start order, so finished port segments can be dropped
+        writer = TraceWriter(f, ordered=True)
+        for task in schedule.window(start, end):
+            writer.add_task(process, task)
+        writer.close()
+    return writer
+
+def main():
+    parser = argparse.ArgumentParser(description='Export PMF schedules as Chrome trace-event JSON (Perfetto)')
+    parser.add_argument('csv_files', nargs='+', help='Task CSV files; each becomes a trace process')
+    parser.add_argument('--output', default='pmf_trace.json', help='Output trace file (.json or .json.gz)')
+    parser.add_argument('--repeat', type=int, help='Repeat a single CSV as a periodic schedule')
+    parser.add_argument('--period', type=int, help='Period for --repeat (default: steady-state initiation interval)')
+    parser.add_argument('--window', type=int, nargs=2, metavar=('START', 'END'), help='Only export this cycle window with --repeat')
+    args = parser.parse_args()
+
+    try:
+        if args.repeat:
+            if len(args.csv_files) != 1:
+                print("Error: --repeat needs exactly one CSV file.")
+                sys.exit(1)
+            from pmf_periodic import PeriodicSchedule
+            schedule = PeriodicSchedule.from_csv(args.csv_files[0], args.repeat, args.period)
+            start, end = args.window if args.window else (None, None)
+            process = os.path.splitext(os.path.basename(args.csv_files[0]))[0]
+            writer = export_periodic(schedule, process, args.output, start, end)
+        else:
+            writer = export_csv_files(args.csv_files, args.output)
+    except (FileNotFoundError, KeyError, ValueError, IndexError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Wrote {writer.events} events ({writer.conflicts} overlap conflicts) to {args.output}")
+
+if __name__ == "__main__":
+    main()
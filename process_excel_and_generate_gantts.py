@@ -11,16 +11,115 @@ import csv
 import subprocess
 import sys
 import os
+import queue
+import threading
+import time
 import matplotlib.pyplot as plt
 from collections import defaultdict
 import re
 
+GANTT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gantt_scheduler.py')
+# Gantt renders are separate processes, so threads only wait on them
+RENDER_WORKERS = max(2, min(8, os.cpu_count() or 2))
+
+TASK_COLUMNS = ['mode', 'pipe begin', 'input begin', 'input end', 'output begin', 'output end']
+
+def parse_time(base, time_str):
+    """
+    解析单个时间字段。
+
+    空值返回None；以'a'开头表示相对base的偏移；无法解析时返回None。
+
+    参数:
+        base (int): 相对时间的基准。
+        time_str (str): 原始字段值。
+
+    返回:
+        int 或 None: 绝对时间。
+    """
+    if not time_str:
+        return None
+    time_str = time_str.strip().rstrip(',')
+    if time_str.startswith('a'):
+        try:
+            return base + int(time_str[1:])
+        except ValueError:
+            return None
+    else:
+        try:
+            return int(time_str)
+        except ValueError:
+            return None
+
+def iter_tasks_from_csv(csv_file_path, config=None):
+    """
+    流式读取CSV文件中的任务。
+
+    单次遍历文件，逐行产出任务字典，并在同一遍中解析'a'相对时间，
+    内存占用与文件大小无关。前3行的配置写入传入的config字典。
+
+    参数:
+        csv_file_path (str): CSV文件路径。
+        config (dict): 可选，用于接收配置(tile, x, y)。
+
+    产出:
+        dict: 任务，字段同 read_tasks_from_csv。
+    """
+    if config is None:
+        config = {}
+    with open(csv_file_path, 'r', newline='', encoding='utf-8') as file:
+        # Read config from first 3 lines
+        for _ in range(3):
+            line = file.readline()
+            if not line:
+                raise IndexError('missing config lines')
+            parts = line.strip().split(',')
+            if len(parts) >= 2:
+                config[parts[0].strip()] = parts[1].strip()
+        # Read tasks from remaining lines
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        try:
+            columns = [header.index(name) for name in TASK_COLUMNS]
+        except ValueError:
+            raise KeyError(f"missing task columns in header: {header}")
+        mode_col, pb_col, ib_col, ie_col, ob_col, oe_col = columns
+        width = max(columns) + 1
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row = row + [''] * (width - len(row))
+
+            pipe_begin = parse_time(0, row[pb_col].strip())
+            input_begin = parse_time(0, row[ib_col].strip())
+            pipe_end = input_begin  # pipe end = input begin
+            input_end = parse_time(input_begin if input_begin is not None else 0, row[ie_col].strip())
+            if input_end is not None:
+                base = input_end
+            else:
+                base = input_begin if input_begin is not None else 0
+            output_begin = parse_time(base, row[ob_col].strip())
+            output_end = parse_time(output_begin if output_begin is not None else 0, row[oe_col].strip())
+
+            yield {
+                'mode': row[mode_col].replace(' ', ''),
+                'pipe_begin': pipe_begin,
+                'pipe_end': pipe_end,
+                'input_begin': input_begin,
+                'input_end': input_end,
+                'output_begin': output_begin,
+                'output_end': output_end
+            }
+
 def read_tasks_from_csv(csv_file_path):
     """
     从CSV文件中读取任务和配置。
 
     解析CSV文件，从前3行提取配置，其余行读取任务。
-    处理带有'a'符号的时间解析。
+    处理带有'a'符号的时间解析。需要逐行处理大文件时使用 iter_tasks_from_csv。
 
     参数:
         csv_file_path (str): CSV文件路径。
@@ -28,60 +127,9 @@ def read_tasks_from_csv(csv_file_path):
     返回:
         tuple: (任务列表, 配置字典)
     """
-    tasks = []
     config = {}
     try:
-        with open(csv_file_path, 'r', newline='', encoding='utf-8') as file:
-            lines = file.readlines()
-            # Read config from first 3 lines
-            for i in range(3):
-                parts = lines[i].strip().split(',')
-                if len(parts) >= 2:
-                    key = parts[0].strip()
-                    value = parts[1].strip()
-                    config[key] = value
-            # Read tasks from remaining lines
-            reader = csv.DictReader(lines[3:])
-            for row in reader:
-                mode = row['mode'].replace(' ', '')
-                pipe_begin_str = row['pipe begin'].strip()
-                input_begin_str = row['input begin'].strip()
-                input_end_str = row['input end'].strip()
-                output_begin_str = row['output begin'].strip()
-                output_end_str = row['output end'].strip()
-
-                # Parse times, handle empty and 'a'
-                def parse_time(base, time_str):
-                    if not time_str:
-                        return None
-                    time_str = time_str.strip().rstrip(',')
-                    if time_str.startswith('a'):
-                        try:
-                            return base + int(time_str[1:])
-                        except ValueError:
-                            return None
-                    else:
-                        try:
-                            return int(time_str)
-                        except ValueError:
-                            return None
-
-                pipe_begin = parse_time(0, pipe_begin_str) if pipe_begin_str else None
-                input_begin = parse_time(0, input_begin_str) if input_begin_str else None
-                pipe_end = input_begin  # pipe end = input begin
-                input_end = parse_time(input_begin, input_end_str) if input_begin is not None else (parse_time(0, input_end_str) if input_end_str else None)
-                output_begin = parse_time(input_end if input_end is not None else input_begin, output_begin_str) if input_begin is not None or input_end is not None or input_end_str else (parse_time(0, output_begin_str) if output_begin_str else None)
-                output_end = parse_time(output_begin, output_end_str) if output_begin is not None else (parse_time(0, output_end_str) if output_end_str else None)
-
-                tasks.append({
-                    'mode': mode,
-                    'pipe_begin': pipe_begin,
-                    'pipe_end': pipe_end,
-                    'input_begin': input_begin,
-                    'input_end': input_end,
-                    'output_begin': output_begin,
-                    'output_end': output_end
-                })
+        tasks = list(iter_tasks_from_csv(csv_file_path, config))
     except FileNotFoundError:
         print(f"Error: CSV file '{csv_file_path}' not found.")
         return [], {}
@@ -158,6 +206,46 @@ def collect_pmf_tasks(csv_files, sheet_names):
                 all_tasks.append(task)
     return all_tasks
 
+def collect_sp_tasks(csv_file, sheet):
+    """
+    从sp sheet的CSV文件中收集PMF任务。
+
+    只保留M8/F8任务并改名为4x4的PMF_sp_xxx，清空输出以外的时间字段，
+    添加sheet元数据(uv固定为Y)。
+
+    参数:
+        csv_file (str): CSV文件路径。
+        sheet (str): 对应的sheet名称。
+
+    返回:
+        list: 增强的sp任务。
+    """
+    tasks, _ = read_tasks_from_csv(csv_file)
+    sp_tasks = [t for t in tasks if t['mode'].startswith('PMF_') and ('M8' in t['mode'] or 'F8' in t['mode'])]
+    for t in sp_tasks:
+        if 'M8' in t['mode'] or 'F8' in t['mode']:
+            t['mode'] = t['mode'].replace('M8', 'M4').replace('F8', 'F4')
+        # other None
+        t['pipe_begin'] = None
+        t['pipe_end'] = None
+        t['input_begin'] = None
+        t['input_end'] = None
+        # mode to PMF_sp_xxx
+        parts = t['mode'].split('_')
+        if len(parts) > 1:
+            xxx = '_'.join(parts[1:])
+            t['mode'] = f"PMF_sp_{xxx}"
+    # Add to level tasks
+    uv = 'Y'
+    c_str = get_c(sheet)
+    rounds = [get_round(sheet)]
+    collected = []
+    for t in sp_tasks:
+        for round_str in rounds:
+            task = {**t, 'sheet': sheet, 'round': round_str, 'c': c_str, 'uv': uv, 'original_mode': t['mode']}
+            collected.append(task)
+    return collected
+
 def clean_pmf_tasks(tasks):
     """
     清理和调整PMF任务。
@@ -258,7 +346,7 @@ def collect_summary_data(tasks, sizes, r, xlim=None):
     filtered = [task for task in tasks if get_size(task['mode']) in sizes and task['round'] == r]
     return filtered
 
-def generate_summary_plot(tasks, sizes, r, xlim):
+def generate_summary_plot(tasks, sizes, r, xlim, output_dir='.'):
     filtered = collect_summary_data(tasks, sizes, r, xlim)
     # For size 8, filter out tasks with output_end > 200, except for round 1
     if '8' in sizes and r != '1':
@@ -285,9 +373,9 @@ def generate_summary_plot(tasks, sizes, r, xlim):
         grouped[(size, uv)].append(task)
     if grouped:
         size_str = '_'.join(sizes)
-        plot_single_summary(grouped, f'PMF_Summary_{size_str}_round{r}.png', f'PMF Output Summary {"/".join(sizes)} Round {r}', xlim)
+        plot_single_summary(grouped, f'PMF_Summary_{size_str}_round{r}.png', f'PMF Output Summary {"/".join(sizes)} Round {r}', xlim, output_dir)
 
-def generate_combined_summary_plot(tasks, size, xlim):
+def generate_combined_summary_plot(tasks, size, xlim, output_dir='.'):
     filtered = [task for task in tasks if get_size(task['mode']) == size]
     if filtered:
         grouped = defaultdict(list)
@@ -295,9 +383,9 @@ def generate_combined_summary_plot(tasks, size, xlim):
             uv = task['uv']
             grouped[(size, uv)].append(task)
         if grouped:
-            plot_single_summary(grouped, f'PMF_Summary_{size}.png', f'PMF Output Summary {size}', xlim)
+            plot_single_summary(grouped, f'PMF_Summary_{size}.png', f'PMF Output Summary {size}', xlim, output_dir)
 
-def plot_single_summary(grouped, filename, title, xlim=None):
+def plot_single_summary(grouped, filename, title, xlim=None, output_dir='.'):
     plt.figure(figsize=(19, 10))
     plt.clf()
 
@@ -397,113 +485,132 @@ def plot_single_summary(grouped, filename, title, xlim=None):
         plt.xlim(xlim)
 
     plt.grid(True, axis='x')
-    if os.path.exists(filename):
-        os.remove(filename)
+    # Size checks above use the bare filename; only the save goes into output_dir
+    path = os.path.join(output_dir, filename)
+    if os.path.exists(path):
+        os.remove(path)
     if '16' in filename or '32' in filename:
-        plt.savefig(filename, dpi=300)
+        plt.savefig(path, dpi=300)
     else:
-        plt.savefig(filename, dpi=300, bbox_inches='tight')
+        plt.savefig(path, dpi=300, bbox_inches='tight')
     plt.close()
 
-def process_category(wb, sheets, category_name, output_dir):
+def render_gantt(sheet_name, csv_file, png_file):
+    """
+    调用gantt_scheduler.py为单个CSV生成PNG(--save-only)。
+
+    csv_file 和 png_file 应为绝对路径(由 process_category 在主线程中给出)。
+    gantt_scheduler.py 读不到任务时也以0退出，因此以PNG是否被重新写出判断成功。
+    """
+    cmd = [sys.executable, GANTT_SCRIPT, '--csv-file', csv_file, '--output', png_file, '--save-only']
+    print(f"Running: {' '.join(cmd)}")
+    started = time.time()
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"Error generating PNG for {sheet_name}: {result.stderr}")
+    elif not os.path.exists(png_file) or os.path.getmtime(png_file) < started - 1:
+        print(f"Error generating PNG for {sheet_name}: {png_file} was not written. {result.stdout.strip()}")
+    else:
+        print(f"Generated {png_file}")
+
+def render_worker(render_queue):
+    # Consume (sheet, csv, png) jobs until the None sentinel arrives
+    while True:
+        job = render_queue.get()
+        if job is None:
+            break
+        # A failed job must not kill the worker, or the producer blocks on a full queue
+        try:
+            render_gantt(*job)
+        except Exception as e:
+            print(f"Error generating PNG for {job[0]}: {e}")
+
+def start_render_workers():
+    """
+    启动渲染线程，返回 (有界队列, 线程列表)，供所有类别共用。
+    """
+    render_queue = queue.Queue(maxsize=RENDER_WORKERS * 2)
+    workers = [threading.Thread(target=render_worker, args=(render_queue,), daemon=True) for _ in range(RENDER_WORKERS)]
+    for worker in workers:
+        worker.start()
+    return render_queue, workers
+
+def stop_render_workers(render_queue, workers):
+    # One sentinel per worker, then wait for the remaining renders
+    for _ in workers:
+        render_queue.put(None)
+    for worker in workers:
+        worker.join()
+
+def write_sheet_csv(sheet, sheet_name, csv_file):
+    """
+    把sheet按openpyxl产出的行逐行写入CSV。
+
+    返回:
+        bool: 是否写入成功。
+    """
+    try:
+        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for row in sheet.iter_rows(values_only=True):
+                writer.writerow(row)
+        print(f"Saved {sheet_name} to {csv_file}")
+        return True
+    except PermissionError:
+        print(f"Warning: Cannot write to {csv_file}, file may be open. Skipping.")
+        return False
+
+def process_category(wb, sheets, category_name, output_dir, render_queue):
     """
     处理特定类别的 sheets（如 PMF 或 264PMF）。
+
+    以流水线方式执行：主线程按openpyxl的顺序逐个sheet写CSV，立即把甘特图渲染
+    交给有界队列 render_queue(由 main 创建、所有类别共用)，并把该sheet的任务增量清理、
+    累加到汇总数据中。全部sheet解析完后，主线程绘制汇总图并返回，不等待渲染完成，
+    渲染线程继续处理剩余的甘特图，下一个类别可以立即开始。
+    每个sheet都可能包含任意Size的任务，所以汇总图要等最后一个sheet解析完才能开始。
+    所有路径在主线程中转为绝对路径，汇总图直接写入output_dir，不切换工作目录。
     """
     if not sheets:
         return []
 
+    output_dir = os.path.abspath(output_dir)
     os.makedirs(output_dir, exist_ok=True)
     print(f"Processing category {category_name} in {output_dir}")
 
-    category_tasks = []
-
+    sp_tasks = []
+    normal_tasks = []
     for sheet_name in sheets:
         sheet = wb[sheet_name]
         csv_file = os.path.join(output_dir, f"{sheet_name}.csv")
-        
+
         if 'sp' in sheet_name:
             # Special handling for sp sheets
-            try:
-                with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    for row in sheet.iter_rows(values_only=True):
-                        writer.writerow(row)
-                print(f"Saved {sheet_name} to {csv_file}")
-            except PermissionError:
-                print(f"Warning: Cannot write to {csv_file}, file may be open. Skipping.")
+            if not write_sheet_csv(sheet, sheet_name, csv_file):
                 continue
-            # Read tasks
-            tasks, _ = read_tasks_from_csv(csv_file)
-            sp_tasks = [t for t in tasks if t['mode'].startswith('PMF_') and ('M8' in t['mode'] or 'F8' in t['mode'])]
-            for t in sp_tasks:
-                if 'M8' in t['mode'] or 'F8' in t['mode']:
-                    t['mode'] = t['mode'].replace('M8', 'M4').replace('F8', 'F4')
-                # other None
-                t['pipe_begin'] = None
-                t['pipe_end'] = None
-                t['input_begin'] = None
-                t['input_end'] = None
-                # mode to PMF_sp_xxx
-                parts = t['mode'].split('_')
-                if len(parts) > 1:
-                    xxx = '_'.join(parts[1:])
-                    t['mode'] = f"PMF_sp_{xxx}"
-            # Add to level tasks
-            uv = 'Y'
-            c_str = get_c(sheet_name)
-            rounds = [get_round(sheet_name)]
-            for t in sp_tasks:
-                for round_str in rounds:
-                    task = {**t, 'sheet': sheet_name, 'round': round_str, 'c': c_str, 'uv': uv, 'original_mode': t['mode']}
-                    category_tasks.append(task)
+            sp_tasks.extend(clean_pmf_tasks(collect_sp_tasks(csv_file, sheet_name)))
         else:
-            # Save to CSV
-            try:
-                with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    for row in sheet.iter_rows(values_only=True):
-                        writer.writerow(row)
-                print(f"Saved {sheet_name} to {csv_file}")
-            except PermissionError:
-                print(f"Warning: Cannot write to {csv_file}, file may be open. Skipping.")
-                continue
-
-            # Generate PNG
-            png_file = os.path.join(output_dir, f"{sheet_name}.png")
-            cmd = [sys.executable, 'gantt_scheduler.py', '--csv-file', csv_file, '--output', png_file, '--save-only']
-            print(f"Running: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                print(f"Error generating PNG for {sheet_name}: {result.stderr}")
-            else:
-                print(f"Generated {png_file}")
-
-    # Now collect all PMF tasks from non-sp sheets
-    sheets_normal = [s for s in sheets if 'sp' not in s]
-    csv_files = [os.path.join(output_dir, f"{sheet}.csv") for sheet in sheets_normal]
-    category_tasks.extend(collect_pmf_tasks(csv_files, sheets_normal))
-    print(f"Collected {len(category_tasks)} tasks for {category_name}.")
+            # Hand the PNG to the render workers; blocks only when the queue is full
+            if write_sheet_csv(sheet, sheet_name, csv_file):
+                png_file = os.path.join(output_dir, f"{sheet_name}.png")
+                render_queue.put((sheet_name, csv_file, png_file))
+            normal_tasks.extend(clean_pmf_tasks(collect_pmf_tasks([csv_file], [sheet_name])))
 
-    # Clean tasks
-    cleaned_tasks = clean_pmf_tasks(category_tasks)
-    print(f"After cleaning: {len(cleaned_tasks)} tasks.")
+    # sp tasks first, same order as the barrier-based version
+    cleaned_tasks = sp_tasks + normal_tasks
+    print(f"Collected and cleaned {len(cleaned_tasks)} tasks for {category_name}.")
 
     # Plot summary
-    orig_cwd = os.getcwd()
-    os.chdir(output_dir)
-    try:
-        sizes = ['4', '8', '16', '32']
-        for size in sizes:
-            if size in ['16', '32']:
-                # Combine round 0 and 1 for size 16 and 32
-                xlim = (0, 800)
-                generate_combined_summary_plot(cleaned_tasks, size, xlim)
-            else:
-                for r in ['0', '1']:
-                    xlim = (0, 200) if size in ['4', '8'] else (0, 800)
-                    generate_summary_plot(cleaned_tasks, [size], r, xlim)
-    finally:
-        os.chdir(orig_cwd)
+    sizes = ['4', '8', '16', '32']
+    for size in sizes:
+        if size in ['16', '32']:
+            # Combine round 0 and 1 for size 16 and 32
+            xlim = (0, 800)
+            generate_combined_summary_plot(cleaned_tasks, size, xlim, output_dir)
+        else:
+            for r in ['0', '1']:
+                xlim = (0, 200) if size in ['4', '8'] else (0, 800)
+                generate_summary_plot(cleaned_tasks, [size], r, xlim, output_dir)
 
     return cleaned_tasks
 
@@ -513,8 +620,8 @@ def main():
         print(f"Error: Excel file '{excel_file}' not found.")
         sys.exit(1)
 
-    # Load workbook
-    wb = openpyxl.load_workbook(excel_file, data_only=True)
+    # Load workbook; read-only mode parses each sheet lazily as its rows are iterated
+    wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
     
     # Identify sheets
     pmf_sheets = [s for s in wb.sheetnames if s.startswith('PMF')]
@@ -527,9 +634,14 @@ def main():
         print("No matching sheets (PMF or 264PMF) found.")
         sys.exit(0)
 
-    # Process each category
-    process_category(wb, pmf_sheets, "PMF", "PMF_Output")
-    process_category(wb, pmf264_sheets, "264PMF", "264PMF_Output")
+    # Process each category; renders share one pool so the next category need not wait for them
+    render_queue, workers = start_render_workers()
+    try:
+        process_category(wb, pmf_sheets, "PMF", "PMF_Output", render_queue)
+        process_category(wb, pmf264_sheets, "264PMF", "264PMF_Output", render_queue)
+    finally:
+        stop_render_workers(render_queue, workers)
+        wb.close()
 
     print("\nAll processing complete.")
     print("Files are organized in 'PMF_Output' and '264PMF_Output' directories.")
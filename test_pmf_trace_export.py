@@ -0,0 +1,83 @@
+import io
+import json
+
+import pytest
+
+from pmf_trace_export import TraceWriter
+
+def pmf_task(mode, input_begin, input_end):
+    return {
+        'mode': mode,
+        'pipe_begin': input_begin,
+        'pipe_end': input_begin,
+        'input_begin': input_begin,
+        'input_end': input_end,
+        'output_begin': None,
+        'output_end': None,
+    }
+
+def export(tasks, ordered=False):
+    f = io.StringIO()
+    writer = TraceWriter(f, ordered=ordered)
+    for task in tasks:
+        writer.add_task('sheet', task)
+    writer.close()
+    events = json.loads(f.getvalue())['traceEvents']
+    return writer, [e for e in events if e.get('cat') == 'conflict']
+
+def test_out_of_order_overlap_is_reported():
+    tasks = [pmf_task('PMF_M8_0_a', 0, 10), pmf_task('PMF_M8_1_a', 20, 30), pmf_task('PMF_M8_2_a', 5, 8)]
+    writer, conflicts = export(tasks)
+    assert writer.conflicts == 1
+    assert conflicts[0]['args']['modes'] == ['PMF_M8_0_a', 'PMF_M8_2_a']
+    assert (conflicts[0]['args']['begin'], conflicts[0]['args']['end']) == (5, 8)
+
+def test_touching_segments_do_not_conflict():
+    tasks = [pmf_task('PMF_M8_0_a', 0, 10), pmf_task('PMF_M8_1_a', 10, 20)]
+    writer, conflicts = export(tasks)
+    assert writer.conflicts == 0 and not conflicts
+
+def test_ordered_writer_rejects_out_of_order_tasks():
+    tasks = [pmf_task('PMF_M8_0_a', 0, 10), pmf_task('PMF_M8_1_a', 20, 30), pmf_task('PMF_M8_2_a', 5, 8)]
+    with pytest.raises(ValueError):
+        export(tasks, ordered=True)
+
+def test_ordered_writer_reports_every_overlapping_pair():
+    tasks = [pmf_task('PMF_M8_0_a', 0, 10), pmf_task('PMF_M8_1_a', 2, 4), pmf_task('PMF_M8_2_a', 3, 12), pmf_task('PMF_M8_3_a', 11, 13)]
+    writer, _ = export(tasks, ordered=True)
+    # (0,1), (0,2), (1,2), (2,3)
+    assert writer.conflicts == 4
+
+def slices_by_track(tasks, ordered=False):
+    f = io.StringIO()
+    writer = TraceWriter(f, ordered=ordered)
+    for task in tasks:
+        writer.add_task('sheet', task)
+    writer.close()
+    events = json.loads(f.getvalue())['traceEvents']
+    names = {e['tid']: e['args']['name'] for e in events if e['ph'] == 'M' and e['name'] == 'thread_name'}
+    tracks = {}
+    for e in events:
+        if e['ph'] == 'X':
+            tracks.setdefault(names[e['tid']], []).append((e['ts'], e['ts'] + e['dur']))
+    return tracks
+
+def test_slices_on_a_track_never_partially_overlap():
+    task = pmf_task('PMF_M16_0_a', 68, 112)
+    task.update({'output_begin': 76, 'output_end': 120})
+    other = pmf_task('PMF_M8_0_a', 0, 10)
+    other.update({'output_begin': 80, 'output_end': 90})
+    tracks = slices_by_track([task, other])
+    for slices in tracks.values():
+        slices.sort()
+        assert all(a_end <= b_begin for (_, a_end), (b_begin, _) in zip(slices, slices[1:]))
+    assert tracks['PMF_M16_0_a input'] == [(68, 112)]
+    assert tracks['PMF_M16_0_a output'] == [(76, 120)]
+    assert tracks['PMF_OUTPUT 16'] == [(76, 120)]
+    assert tracks['PMF_OUTPUT 8'] == [(80, 90)]
+
+def test_out_of_order_slices_share_a_lane_unless_they_overlap():
+    tasks = [pmf_task('PMF_M8_0_a', 0, 10), pmf_task('PMF_M8_1_a', 20, 30), pmf_task('PMF_M8_2_a', 12, 18), pmf_task('PMF_M8_3_a', 5, 8)]
+    tracks = slices_by_track(tasks)
+    assert sorted(tracks['PMF_INPUT']) == [(0, 10), (12, 18), (20, 30)]
+    assert tracks['PMF_INPUT #2'] == [(5, 8)]